@@ -0,0 +1,113 @@
+"""Measure the per-node cost of visitor dispatch in the compiler passes.
+
+    python benchmarks/dispatch.py [--functions=300] [--repeat=5]
+
+Every node of an analysed generated program is visited with visit methods that do nothing, once
+through `CompilerPass.visit` and once through the dispatch it replaced, which formatted
+`visit_<class>` and called hasattr and getattr on every visit. The same is done for the
+memory management check of `CodeGeneration.visit`. Then the whole Analyser and CodeGeneration
+are timed to show what share of a pass the dispatch is."""
+from time import perf_counter
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from cure.passes.code_generation import CodeGeneration, DONT_MANAGE_MEMORY
+from cure.passes import CompilerPass, NODE_CLASSES
+from cure.passes.analyser import Analyser
+from cure.parser.pratt import PrattParser
+from generate import generate_program
+from cure import ir
+
+
+def visit_nothing(self, node: ir.Node):
+    return None
+
+# a pass with a visit method for every node class, created with them so that they are in its
+# dispatch table
+NullPass = type('NullPass', (CompilerPass,), {
+    f'visit_{cls.__name__}': visit_nothing for cls in NODE_CLASSES
+})
+
+def old_visit(self, node: ir.Node):
+    method_name = f'visit_{type(node).__name__}'
+    if hasattr(self, method_name):
+        method = getattr(self, method_name)
+        return method(node)
+    else:
+        raise AttributeError(f'No method {method_name}')
+
+def old_manages_memory(codegen: CodeGeneration, node: ir.Node):
+    if isinstance(node, DONT_MANAGE_MEMORY):
+        return False
+
+    return node.type.needs_memory_management(codegen.scope)
+
+def per_node(func, nodes: list[ir.Node], repeat: int):
+    """Fastest time of `func` over every node in nanoseconds per node"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        for node in nodes:
+            func(node)
+
+        best = min(best, perf_counter() - start)
+
+    return best / len(nodes) * 1e9
+
+def best_time(func, repeat: int):
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        best = min(best, perf_counter() - start)
+
+    return best * 1000
+
+def main(args: list[str]):
+    functions, repeat = 300, 5
+    for arg in args:
+        if arg.startswith('--functions='):
+            functions = int(arg.removeprefix('--functions='))
+        elif arg.startswith('--repeat='):
+            repeat = int(arg.removeprefix('--repeat='))
+
+    src = generate_program(functions, strings=4)
+    ir.Scope.keep_prelude()
+    file = Path('dispatch.cure')
+
+    def new_scope():
+        return ir.Scope.toplevel(file, src)
+
+    parsed = PrattParser(new_scope()).build()
+    scope = new_scope()
+    program = Analyser.run(scope, parsed)
+    nodes = list(program.walk())
+
+    null_pass = NullPass(scope)
+    codegen = CodeGeneration(scope)
+    print(f'{len(nodes)} nodes')
+    print(f'{"per node":<24} {"before":>9} {"after":>9}')
+    for name, before, after in (
+        (
+            'visit dispatch',
+            per_node(lambda node: old_visit(null_pass, node), nodes, repeat),
+            per_node(lambda node: null_pass.visit(node), nodes, repeat)
+        ),
+        (
+            'memory management check',
+            per_node(lambda node: old_manages_memory(codegen, node), nodes, repeat),
+            per_node(lambda node: codegen._manages_memory(node), nodes, repeat)
+        )
+    ):
+        print(f'{name:<24} {before:>7.0f}ns {after:>7.0f}ns')
+
+    analyse_time = best_time(lambda: Analyser.run(new_scope(), parsed), repeat)
+    codegen_time = best_time(lambda: CodeGeneration.run(new_scope(), program), repeat)
+    print(f'\nAnalyser {analyse_time:.1f}ms, CodeGeneration {codegen_time:.1f}ms')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
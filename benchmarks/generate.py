@@ -0,0 +1,135 @@
+"""Generate synthetic Cure programs of a given size for the compiler benchmarks.
+
+    python benchmarks/generate.py 1000 > big.cure
+
+Every function is a small mix of what real programs use: mutable variables, a while loop, an
+if/else if/else chain, arithmetic with mixed precedence, comparisons, a cast, a ternary, a
+call to the previous function and a string attribute. `main` calls the last one, so the
+program also compiles and runs.
+
+The shape of the functions can be stretched in four directions for the scaling benchmark:
+the depth of a nested expression, the length of an else if chain, a number of string
+concatenations and the depth of nested while loops.
+
+    python benchmarks/generate.py 100 --depth=20 --chain=30 --strings=10 --loops=4"""
+from pathlib import Path
+import sys
+
+
+FUNCTION_TEMPLATE = '''fn f{i}(int a, int b) -> int {{
+    mut total = a * {k} + b % {m} - (a - b) / {m}
+    mut i = 0
+    while i < b {{
+        if total > {limit} && i != {k} {{
+            total = total - {limit} / {m}
+        }} else if total < -{limit} || i == {m} {{
+            total += {k}
+        }} else {{
+            total = total + i * {m} - {k}
+        }}
+
+        i += 1
+    }}
+{extra}
+    scale = (float)total * {k}.5
+    bonus = {m} if scale > 0.0 else {k}
+    name = "f{i}"
+    return {call} + name.length + bonus
+}}
+'''
+
+MAIN_TEMPLATE = '''fn main() -> int {{
+    print(f{last}({k}, {m}))
+    return 0
+}}
+'''
+
+
+def generate_expression(depth: int, k: int, m: int):
+    """An arithmetic expression nested `depth` parentheses deep"""
+    expr = 'a'
+    for d in range(depth):
+        op = ('+', '*', '-', '%')[d % 4]
+        expr = f'({expr} {op} {d % m + 1 if op == "%" else d + k})'
+
+    return expr
+
+def generate_chain(length: int, k: int):
+    branches = [f'if a == 0 {{\n        total += {k}\n    }}']
+    for j in range(1, length):
+        branches.append(f'if a == {j} {{\n        total += {j * k}\n    }}')
+
+    return ' else '.join(branches) + ' else {\n        total -= 1\n    }'
+
+def generate_strings(count: int, i: int):
+    lines = [f'mut text = "f{i}"']
+    for j in range(count):
+        lines.append(f'text = text + "_{j}" + b.to_string()')
+
+    lines.append('total += text.length')
+    return '\n    '.join(lines)
+
+def generate_loops(depth: int):
+    # the counters are declared up front, a variable declared in a loop body is allocated on
+    # the stack on every iteration
+    lines = [f'    mut l{d} = 0' for d in range(depth)]
+    for d in range(depth):
+        indent = '    ' * (d + 1)
+        if d > 0:
+            lines.append(f'{indent}l{d} = 0')
+        lines.append(f'{indent}while l{d} < b {{')
+
+    lines.append(f'{"    " * (depth + 1)}total += l{depth - 1}')
+    for d in reversed(range(depth)):
+        indent = '    ' * (d + 2)
+        lines.append(f'{indent}l{d} += 1')
+        lines.append(f'{indent[4:]}}}')
+
+    return '\n'.join(lines)
+
+def generate_function(i: int, depth: int = 0, chain: int = 0, strings: int = 0, loops: int = 0):
+    k, m = i % 7 + 2, i % 5 + 3
+    call = f'f{i - 1}(total % {m + 10}, {k})' if i > 0 else 'total'
+    extra = []
+    if depth > 0:
+        extra.append(f'    total += {generate_expression(depth, k, m)}')
+    if chain > 0:
+        extra.append(f'    {generate_chain(chain, k)}')
+    if strings > 0:
+        extra.append(f'    {generate_strings(strings, i)}')
+    if loops > 0:
+        extra.append(generate_loops(loops))
+
+    return FUNCTION_TEMPLATE.format(
+        i=i, k=k, m=m, limit=1000 + i, call=call, extra=''.join(f'\n{e}\n' for e in extra)
+    )
+
+def generate_program(
+    functions: int, depth: int = 0, chain: int = 0, strings: int = 0, loops: int = 0
+):
+    """A Cure program with `functions` generated functions and a `main` that calls the last"""
+    parts = [generate_function(i, depth, chain, strings, loops) for i in range(functions)]
+    parts.append(MAIN_TEMPLATE.format(last=functions - 1, k=3, m=4))
+    return '\n'.join(parts)
+
+def write_program(directory: Path, functions: int):
+    file = directory / f'generated_{functions}.cure'
+    file.write_text(generate_program(functions), 'utf-8')
+    return file
+
+
+def main(args: list[str]):
+    functions = 100
+    shape = {}
+    for arg in args:
+        if arg.startswith('--'):
+            name, _, value = arg.removeprefix('--').partition('=')
+            shape[name] = int(value)
+        else:
+            functions = int(arg)
+
+    sys.stdout.write(generate_program(functions, **shape))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,88 @@
+"""Compare the incremental front end with a full parse and analysis after typical edits.
+
+    python benchmarks/incremental_compare.py [--functions=100] [--parser=antlr|fast]
+
+A generated program is edited step by step and after every edit both front ends run on the
+new source. Their trees and the LLVM IR generated from them must be equal."""
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from cure.passes.code_generation import CodeGeneration
+from cure.incremental import IncrementalFrontEnd
+from cure.passes.analyser import Analyser
+from generate import generate_program
+from cure import ir
+
+
+def full_front_end(file: Path, src: str, parser: str):
+    scope = ir.Scope.toplevel(file, src)
+    if parser == 'fast':
+        from cure.parser.pratt import PrattParser
+
+        program = PrattParser(scope).build()
+    else:
+        from cure.parser.ir_builder import CureIRBuilder
+
+        program = CureIRBuilder(scope).build()
+
+    return scope, Analyser.run(scope, program)
+
+def get_edits(src: str):
+    """(description, source) pairs, every edit builds on the previous one"""
+    edits = [('unchanged', src)]
+    src = src.replace('total = total - 1010 / 3', 'total = total - 1011 / 3')
+    edits.append(('edit the body of f10', src))
+    src = src.replace('    mut i = 0\n', '    mut  i = 0\n', 1)
+    edits.append(('move a column in f0', src))
+    src = src.replace('fn f5(int a, int b)', 'fn f5(int a, int c, int b)')
+    src = src.replace('return f5(total % 14, 8)', 'return f5(total % 14, 1, 8)')
+    edits.append(('change the signature of f5', src))
+    src = src.replace('fn f3(', '\n\n\nfn f3(')
+    edits.append(('insert lines before f3', src))
+    src = src.replace('fn f3(', 'x = 1\nfn f3(')
+    edits.append(('add a global before f3', src))
+    return edits
+
+def main(args: list[str]):
+    functions, parser = 100, 'antlr'
+    for arg in args:
+        if arg.startswith('--functions='):
+            functions = int(arg.removeprefix('--functions='))
+        elif arg.startswith('--parser='):
+            parser = arg.removeprefix('--parser=')
+
+    with TemporaryDirectory() as directory:
+        file = Path(directory) / 'incremental.cure'
+        src = generate_program(functions)
+        file.write_text(src, 'utf-8')
+
+        front_end = IncrementalFrontEnd(file, parser)
+        front_end.update()
+
+        print(f'{"edit":<28} {"full":>10} {"incremental":>12} {"reparsed":>9} {"reanalysed":>11}')
+        for description, src in get_edits(src):
+            start = perf_counter()
+            full_scope, full_program = full_front_end(file, src, parser)
+            full_time = perf_counter() - start
+
+            start = perf_counter()
+            scope, program = front_end.update(src)
+            incremental_time = perf_counter() - start
+
+            if program != full_program or\
+                CodeGeneration.run(scope, program) != CodeGeneration.run(full_scope, full_program):
+                raise AssertionError(f'{description}: the front ends built different programs')
+
+            print(
+                f'{description:<28} {full_time * 1000:>8.2f}ms {incremental_time * 1000:>10.2f}ms '\
+                    f'{front_end.reparsed:>9} {front_end.reanalysed:>11}'
+            )
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,80 @@
+"""Measure the memory taken by the IR tree of a large generated program.
+
+    python benchmarks/ir_memory.py [--functions=1000] [--parser=antlr|fast]
+
+The program is parsed and analysed once to time them, then again under tracemalloc. The memory
+still allocated while the tree is alive is the tree's size, it does not include the parser's
+caches, which the first parse filled, or anything else freed on the way."""
+from time import perf_counter
+from pathlib import Path
+import tracemalloc
+import gc
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from cure.passes.analyser import Analyser
+from cure.cache import format_size
+from generate import generate_program
+from cure import ir
+
+
+def get_parser(parser: str, scope: ir.Scope):
+    if parser == 'fast':
+        from cure.parser.pratt import PrattParser
+
+        return PrattParser(scope)
+
+    from cure.parser.ir_builder import CureIRBuilder
+
+    return CureIRBuilder(scope)
+
+def measure(build):
+    """Build a tree, then build it again under tracemalloc and return it with the memory it
+    holds and the time the first build took"""
+    start = perf_counter()
+    build()
+    elapsed = perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    tree = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return tree, size, elapsed
+
+def main(args: list[str]):
+    functions, parser = 1000, 'antlr'
+    for arg in args:
+        if arg.startswith('--functions='):
+            functions = int(arg.removeprefix('--functions='))
+        elif arg.startswith('--parser='):
+            parser = arg.removeprefix('--parser=')
+
+    src = generate_program(functions)
+    ir.Scope.keep_prelude()
+    file = Path('ir_memory.cure')
+    program, parsed_size, parse_time = measure(
+        lambda: get_parser(parser, ir.Scope.toplevel(file, src)).build()
+    )
+    analysed, analysed_size, analyse_time = measure(
+        lambda: Analyser.run(ir.Scope.toplevel(file, src), program)
+    )
+
+    print(f'{functions} functions, {src.count(chr(10))} lines')
+    print(f'{"tree":<10} {"nodes":>8} {"memory":>11} {"per node":>9} {"time":>10}')
+    for name, tree, size, elapsed in (
+        ('parsed', program, parsed_size, parse_time),
+        ('analysed', analysed, analysed_size, analyse_time)
+    ):
+        nodes = sum(1 for _ in tree.walk())
+        print(
+            f'{name:<10} {nodes:>8} {format_size(size):>11} {size / nodes:>8.0f}B '\
+                f'{elapsed * 1000:>8.1f}ms'
+        )
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,69 @@
+"""Check that the hand-written Pratt parser builds the same tree as the ANTLR parser and compare
+their speed.
+
+    python benchmarks/parser_compare.py [--functions=200] [--repeat=5] [file.cure ...]
+
+Without files it parses every program in examples/ and a generated program with `--functions`
+functions. Only the front end runs, the trees are compared with `==`."""
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from cure.parser.ir_builder import CureIRBuilder
+from cure.parser.pratt import PrattParser
+from generate import write_program
+from cure import ir
+
+
+EXAMPLES_PATH = Path(__file__).parent.parent / 'examples'
+
+
+def best_time(parser_class, scope: ir.Scope, repeat: int):
+    best = float('inf')
+    program = None
+    for _ in range(repeat):
+        start = perf_counter()
+        program = parser_class(scope).build()
+        best = min(best, perf_counter() - start)
+
+    return program, best
+
+def compare(file: Path, repeat: int):
+    scope = ir.Scope.toplevel(file)
+    antlr_program, antlr_time = best_time(CureIRBuilder, scope, repeat)
+    fast_program, fast_time = best_time(PrattParser, scope, repeat)
+    if antlr_program != fast_program:
+        raise AssertionError(f'{file.name}: the parsers built different trees')
+
+    print(
+        f'{file.name:<28} {len(scope.src):>9} {antlr_time * 1000:>10.2f}ms '\
+            f'{fast_time * 1000:>10.2f}ms {antlr_time / fast_time:>7.1f}x'
+    )
+
+def main(args: list[str]):
+    functions, repeat = 200, 5
+    files = []
+    for arg in args:
+        if arg.startswith('--functions='):
+            functions = int(arg.removeprefix('--functions='))
+        elif arg.startswith('--repeat='):
+            repeat = int(arg.removeprefix('--repeat='))
+        else:
+            files.append(Path(arg))
+
+    print(f'{"file":<28} {"chars":>9} {"antlr":>12} {"fast":>12} {"speedup":>8}')
+    with TemporaryDirectory() as directory:
+        if not files:
+            files = sorted(EXAMPLES_PATH.glob('*.cure'))
+            files.append(write_program(Path(directory), functions))
+
+        for file in files:
+            compare(file, repeat)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
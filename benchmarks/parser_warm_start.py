@@ -0,0 +1,85 @@
+"""Compare the ANTLR parse time of a fresh process with and without `--parser-cache`.
+
+    python benchmarks/parser_warm_start.py [--functions=20] [file.cure ...]
+
+Every file is parsed in a new interpreter three ways: cold, with the cached DFAs loaded and a
+second time in the same process, which is the steady-state speed. The cache lives in a
+temporary directory that is warmed with all the files first. Each parse is checked against
+the Pratt parser's tree."""
+from tempfile import TemporaryDirectory
+from subprocess import run, PIPE
+from os import environ
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from generate import write_program
+
+
+PACKAGE_ROOT = Path(__file__).parent.parent
+EXAMPLES_PATH = PACKAGE_ROOT / 'examples'
+
+PARSE_CODE = '''
+import sys
+from time import perf_counter
+from pathlib import Path
+
+from cure.parser.ir_builder import CureIRBuilder
+from cure.parser.pratt import PrattParser
+from cure.cache import CompileCache
+from cure import ir
+
+scope = ir.Scope.toplevel(Path(sys.argv[1]))
+if sys.argv[2] in ('warm', 'save'):
+    from cure.parser import dfa_cache
+    dfa_cache.load(CompileCache())
+
+times = []
+for _ in range(2):
+    start = perf_counter()
+    program = CureIRBuilder(scope).build()
+    times.append(perf_counter() - start)
+
+if sys.argv[2] == 'save':
+    dfa_cache.save(CompileCache())
+
+assert program == PrattParser(scope).build(), 'the parsers built different trees'
+print(*times)
+'''
+
+
+def parse_times(file: Path, mode: str, env: dict[str, str]):
+    result = run(
+        [sys.executable, '-c', PARSE_CODE, file.as_posix(), mode], stdout=PIPE, text=True, env=env,
+        check=True
+    )
+    return [float(time) * 1000 for time in result.stdout.split()]
+
+def main(args: list[str]):
+    functions = 20
+    files = []
+    for arg in args:
+        if arg.startswith('--functions='):
+            functions = int(arg.removeprefix('--functions='))
+        else:
+            files.append(Path(arg))
+
+    with TemporaryDirectory() as directory:
+        env = dict(environ, CURE_CACHE_DIR=directory, PYTHONPATH=PACKAGE_ROOT.as_posix())
+        if not files:
+            files = sorted(EXAMPLES_PATH.glob('*.cure'))
+            files.append(write_program(Path(directory), functions))
+
+        for file in files:
+            parse_times(file, 'save', env)
+
+        print(f'{"file":<28} {"cold":>10} {"cached DFA":>12} {"steady":>10}')
+        for file in files:
+            cold, steady = parse_times(file, 'cold', env)
+            warm, _ = parse_times(file, 'warm', env)
+            print(f'{file.name:<28} {cold:>8.2f}ms {warm:>10.2f}ms {steady:>8.2f}ms')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,30 @@
+#include <stdio.h>
+
+/* Cure's float is 32 bits wide, so the baseline uses float as well */
+static int escapes(float x0, float y0, int limit) {
+    float x = 0.0f, y = 0.0f, xtemp;
+    for (int i = 0; i < limit; i++) {
+        xtemp = x*x - y*y + x0;
+        y = 2.0f*x*y + y0;
+        x = xtemp;
+        if (x*x + y*y > 4.0f) {
+            return i;
+        }
+    }
+
+    return limit;
+}
+
+int main(void) {
+    int inside = 0;
+    for (float y = -1.5f; y < 1.5f; y += 0.005f) {
+        for (float x = -2.0f; x < 1.0f; x += 0.005f) {
+            if (escapes(x, y, 500) == 500) {
+                inside++;
+            }
+        }
+    }
+
+    printf("%d\n", inside);
+    return 0;
+}
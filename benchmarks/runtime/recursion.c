@@ -0,0 +1,20 @@
+#include <stdio.h>
+
+static int fib(int n) {
+    if (n < 2) return n;
+
+    return fib(n - 1) + fib(n - 2);
+}
+
+static int ackermann(int m, int n) {
+    if (m == 0) return n + 1;
+    if (n == 0) return ackermann(m - 1, 1);
+
+    return ackermann(m - 1, ackermann(m, n - 1));
+}
+
+int main(void) {
+    printf("%d\n", fib(32));
+    printf("%d\n", ackermann(2, 2000));
+    return 0;
+}
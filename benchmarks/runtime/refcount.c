@@ -0,0 +1,70 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+/* strings carry a reference count and are freed when it drops to zero, like Cure's */
+typedef struct {
+    char *ptr;
+    int length;
+    int ref_count;
+} String;
+
+static String *string_new(const char *ptr, int length) {
+    String *s = malloc(sizeof(String));
+    s->ptr = malloc(length + 1);
+    memcpy(s->ptr, ptr, length);
+    s->ptr[length] = '\0';
+    s->length = length;
+    s->ref_count = 1;
+    return s;
+}
+
+static String *string_inc(String *s) {
+    s->ref_count++;
+    return s;
+}
+
+static void string_dec(String *s) {
+    if (--s->ref_count == 0) {
+        free(s->ptr);
+        free(s);
+    }
+}
+
+static String *tag(String *s, int i) {
+    char buffer[64];
+    int length = snprintf(buffer, sizeof(buffer), "%s%d", s->ptr, i);
+    return string_new(buffer, length);
+}
+
+static String *trim(String *s) {
+    if (s->length < 48) {
+        return string_inc(s);
+    }
+
+    return string_new("#", 1);
+}
+
+static int pass_along(String *s, int depth) {
+    string_inc(s);
+    int result = depth == 0 ? s->length : pass_along(s, depth - 1);
+    string_dec(s);
+    return result;
+}
+
+int main(void) {
+    String *s = string_new("", 0);
+    int total = 0;
+    for (int i = 0; i < 300000; i++) {
+        String *tagged = tag(s, i % 10);
+        String *trimmed = trim(tagged);
+        string_dec(tagged);
+        string_dec(s);
+        s = trimmed;
+        total += pass_along(s, 16);
+    }
+
+    printf("%s\n%d\n", s->ptr, total);
+    string_dec(s);
+    return 0;
+}
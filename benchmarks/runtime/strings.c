@@ -0,0 +1,36 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+/* every concatenation allocates a new string, as Cure's string + does */
+static char *concat_int(const char *s, int i) {
+    char digits[16];
+    int digits_length = sprintf(digits, "%d", i);
+    size_t length = strlen(s);
+    char *result = malloc(length + digits_length + 1);
+    memcpy(result, s, length);
+    memcpy(result + length, digits, digits_length + 1);
+    return result;
+}
+
+int main(void) {
+    int matches = 0, total = 0;
+    for (int i = 0; i < 300000; i++) {
+        char *key = concat_int("item", i);
+        char *other = concat_int("item", i % 1000);
+        size_t length = strlen(key);
+        if (length == strlen(other) && memcmp(key, other, length) == 0) {
+            matches++;
+        }
+
+        if (length != 5 || memcmp(key, "item7", 5) != 0) {
+            total += (int)length;
+        }
+
+        free(other);
+        free(key);
+    }
+
+    printf("%d\n%d\n", matches, total);
+    return 0;
+}
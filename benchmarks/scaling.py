@@ -0,0 +1,171 @@
+"""Measure how every compiler phase scales with the size and shape of the program.
+
+    python benchmarks/scaling.py [--series=functions,depth,...] [--parser=antlr|fast]
+        [--opt-level=2] [--repeat=3] [--steps=5]
+
+Every series grows one dimension of the generated programs (see generate.py) and doubles it
+`--steps` times: the number of functions, the nesting depth of an expression, the length of
+an else if chain, the number of string concatenations and the depth of nested while loops.
+Each point is compiled in-process through the parser, the `Analyser`, `CodeGeneration` and
+LLVM (parsing the IR, optimising and emitting an object file) and the fastest of `--repeat`
+runs is kept.
+
+The scaling exponent of a phase is the slope of a least squares fit of log(time) against
+log(tokens), 1 is linear and 2 quadratic. Exponents over `SUPERLINEAR` are marked. A point
+that overflows Python's recursion limit ends its series and is reported."""
+from time import perf_counter
+from pathlib import Path
+from math import log
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from cure.backend import create_target_machine, emit_object, init_llvm
+from cure.passes.code_generation import CodeGeneration
+from cure.passes.analyser import Analyser
+from cure.parser.pratt import tokenize
+from generate import generate_program
+from cure import ir
+
+
+PHASES = ('parse', 'analyse', 'codegen', 'llvm')
+SUPERLINEAR = 1.15
+
+# series name -> (the generate_program argument that grows, its first value, the other arguments)
+SERIES = {
+    'functions': ('functions', 25, {}),
+    'depth': ('depth', 4, {'functions': 10}),
+    'chain': ('chain', 8, {'functions': 10}),
+    'strings': ('strings', 8, {'functions': 10}),
+    'loops': ('loops', 2, {'functions': 10}),
+}
+
+
+def get_parser(parser: str, scope: ir.Scope):
+    if parser == 'fast':
+        from cure.parser.pratt import PrattParser
+
+        return PrattParser(scope)
+
+    from cure.parser.ir_builder import CureIRBuilder
+
+    return CureIRBuilder(scope)
+
+def compile_once(src: str, parser: str, target_machine, opt_level: str):
+    """Compile `src` once and return the time every phase took"""
+    scope = ir.Scope.toplevel(Path('scaling.cure'), src)
+    times = {}
+
+    start = perf_counter()
+    program = get_parser(parser, scope).build()
+    times['parse'] = perf_counter() - start
+
+    start = perf_counter()
+    program = Analyser.run(scope, program)
+    times['analyse'] = perf_counter() - start
+
+    start = perf_counter()
+    code = CodeGeneration.run(scope, program)
+    times['codegen'] = perf_counter() - start
+
+    start = perf_counter()
+    emit_object(code, target_machine, opt_level)
+    times['llvm'] = perf_counter() - start
+    return times
+
+def measure(src: str, parser: str, target_machine, opt_level: str, repeat: int):
+    runs = [compile_once(src, parser, target_machine, opt_level) for _ in range(repeat)]
+    return {phase: min(times[phase] for times in runs) for phase in PHASES}
+
+def fit_exponent(sizes: list[int], times: list[float]):
+    """Slope of the least squares line through (log size, log time)"""
+    xs = [log(size) for size in sizes]
+    ys = [log(max(time, 1e-9)) for time in times]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    if var_x == 0:
+        return 0.0
+
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+
+def run_series(
+    name: str, steps: int, parser: str, target_machine, opt_level: str, repeat: int
+):
+    knob, first, shape = SERIES[name]
+    print(f'\n{name}')
+    print(f'{knob:>10} {"lines":>8} {"tokens":>8}', *(f'{phase:>10}' for phase in PHASES))
+
+    sizes, results = [], []
+    value = first
+    for _ in range(steps):
+        src = generate_program(**(shape | {knob: value}))
+        tokens = len(tokenize(src))
+        try:
+            times = measure(src, parser, target_machine, opt_level, repeat)
+        except RecursionError:
+            print(f'{value:>10} {src.count(chr(10)):>8} {tokens:>8} recursion limit reached')
+            break
+
+        sizes.append(tokens)
+        results.append(times)
+        print(
+            f'{value:>10} {src.count(chr(10)):>8} {tokens:>8}',
+            *(f'{times[phase] * 1000:>8.1f}ms' for phase in PHASES)
+        )
+        value *= 2
+
+    if len(sizes) < 2:
+        return {}
+
+    exponents = {
+        phase: fit_exponent(sizes, [times[phase] for times in results]) for phase in PHASES
+    }
+    print(
+        f'{"exponent":>28}', *(
+            f'{exponent:>9.2f}{"!" if exponent > SUPERLINEAR else " "}'
+            for exponent in exponents.values()
+        )
+    )
+    return exponents
+
+def main(args: list[str]):
+    series, parser, opt_level, repeat, steps = list(SERIES), 'antlr', '2', 3, 5
+    for arg in args:
+        if arg.startswith('--series='):
+            series = arg.removeprefix('--series=').split(',')
+        elif arg.startswith('--parser='):
+            parser = arg.removeprefix('--parser=')
+        elif arg.startswith('--opt-level='):
+            opt_level = arg.removeprefix('--opt-level=')
+        elif arg.startswith('--repeat='):
+            repeat = int(arg.removeprefix('--repeat='))
+        elif arg.startswith('--steps='):
+            steps = int(arg.removeprefix('--steps='))
+
+    for name in series:
+        if name not in SERIES:
+            print(f'unknown series {name}, expected one of {", ".join(SERIES)}')
+            sys.exit(1)
+
+    init_llvm()
+    # the types and the builtins are set up once, as the watcher and the daemon do
+    ir.Scope.keep_prelude()
+    target_machine = create_target_machine(opt_level)
+    # the first parse fills ANTLR's prediction caches, keep it out of the measurements
+    compile_once(generate_program(5), parser, target_machine, opt_level)
+
+    exponents = {
+        name: run_series(name, steps, parser, target_machine, opt_level, repeat)
+        for name in series
+    }
+
+    print(f'\nscaling exponents (time ~ tokens^k, ! is over {SUPERLINEAR})')
+    print(f'{"series":<10}', *(f'{phase:>10}' for phase in PHASES))
+    for name, series_exponents in exponents.items():
+        if series_exponents:
+            print(f'{name:<10}', *(f'{series_exponents[phase]:>10.2f}' for phase in PHASES))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,101 @@
+"""Compare the ANTLR parser in full LL mode with the two-stage SLL then LL parse of
+`CureIRBuilder`.
+
+    python benchmarks/sll_compare.py [--functions=200] [--repeat=5] [file.cure ...]
+
+Without files it parses every program in examples/ and a generated program with `--functions`
+functions. `sll` tells whether the SLL stage was enough or the file needed the LL fallback."""
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from antlr4 import InputStream, CommonTokenStream
+from antlr4.error.Errors import ParseCancellationException
+from antlr4.error.ErrorStrategy import BailErrorStrategy
+from antlr4.atn.PredictionMode import PredictionMode
+
+from cure.parser.ir_builder import CureIRBuilder
+from cure.parser.CureParser import CureParser
+from cure.parser.CureLexer import CureLexer
+from generate import write_program
+from cure import ir
+
+
+EXAMPLES_PATH = Path(__file__).parent.parent / 'examples'
+
+
+def tokenize(src: str):
+    tokens = CommonTokenStream(CureLexer(InputStream(src)))
+    tokens.fill()
+    return tokens
+
+def parse_ll(builder: CureIRBuilder, tokens: CommonTokenStream):
+    parser = CureParser(tokens)
+    parser.removeErrorListeners()
+    parser._interp.predictionMode = PredictionMode.LL
+    return parser.parse()
+
+def parse_sll_only(tokens: CommonTokenStream):
+    parser = CureParser(tokens)
+    parser.removeErrorListeners()
+    parser._interp.predictionMode = PredictionMode.SLL
+    parser._errHandler = BailErrorStrategy()
+    try:
+        parser.parse()
+        return True
+    except ParseCancellationException:
+        return False
+
+def best_time(parse, builder: CureIRBuilder, repeat: int):
+    """Best parse time without lexing, the token stream is filled before the clock starts"""
+    best = float('inf')
+    program = None
+    for _ in range(repeat):
+        tokens = tokenize(builder.src)
+        start = perf_counter()
+        tree = parse(builder, tokens)
+        best = min(best, perf_counter() - start)
+        program = builder.visit(tree)
+
+    return program, best
+
+def compare(file: Path, repeat: int):
+    builder = CureIRBuilder(ir.Scope.toplevel(file))
+    ll_program, ll_time = best_time(parse_ll, builder, repeat)
+    program, time = best_time(CureIRBuilder.parse, builder, repeat)
+    if ll_program != program:
+        raise AssertionError(f'{file.name}: the parses built different trees')
+
+    sll = 'yes' if parse_sll_only(tokenize(builder.src)) else 'no'
+    print(
+        f'{file.name:<28} {len(builder.src):>9} {ll_time * 1000:>10.2f}ms '\
+            f'{time * 1000:>10.2f}ms {ll_time / time:>7.1f}x {sll:>4}'
+    )
+
+def main(args: list[str]):
+    functions, repeat = 200, 5
+    files = []
+    for arg in args:
+        if arg.startswith('--functions='):
+            functions = int(arg.removeprefix('--functions='))
+        elif arg.startswith('--repeat='):
+            repeat = int(arg.removeprefix('--repeat='))
+        else:
+            files.append(Path(arg))
+
+    print(f'{"file":<28} {"chars":>9} {"LL":>12} {"SLL/LL":>12} {"speedup":>8} {"sll":>4}')
+    with TemporaryDirectory() as directory:
+        if not files:
+            files = sorted(EXAMPLES_PATH.glob('*.cure'))
+            files.append(write_program(Path(directory), functions))
+
+        for file in files:
+            compare(file, repeat)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
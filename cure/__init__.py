@@ -1,80 +1,454 @@
-from ctypes import CFUNCTYPE, c_int
-from dataclasses import dataclass
-from sys import exit as sys_exit
+from dataclasses import dataclass, field, fields
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, cast
+from platform import system, machine
+from sys import exit as sys_exit, stderr
 from time import perf_counter
 from subprocess import run
-from logging import info
 from pathlib import Path
-from typing import cast
+from json import dumps
 
-from llvmlite import binding as llvm
+from cure.backend import emit_object, link, get_host_cpu, flush_c_streams, OPT_LEVELS
+from cure.cache import CompileCache, compiler_version, parse_size
+from cure.target import Target
+from cure.timing import TIMER
+from cure.trace import TRACE, trace, enable as enable_trace, parse_categories
 
-from cure.passes.code_generation import CodeGeneration
-from cure.parser.ir_builder import CureIRBuilder
-from cure.passes.analyser import Analyser
-from cure import ir
+# the parser, the passes, LLVM and the JIT engines are imported by the functions that use them,
+# so `cure help` and build cache hits start without loading any of them
+if TYPE_CHECKING:
+    from llvmlite import binding as llvm
+
+    from cure import ir
 
 
 HELP = """usage: cure [action] [options]
 
-actions: build, help
+actions: build, run, watch, bench, cache, serve, startup-profile, help
+
+options:
+    --trace[=<categories>]  print compiler trace messages to stderr, categories are a comma
+                            separated list of parse, analyse, codegen, stdlib, jit, cache and
+                            driver (default: all)
+    --trace-file <path>     write trace messages to this file instead of stderr
+
+build options:
+    --linker <linker>       program used to link the object file (default: clang)
+    --via-clang             write a .ll file and let clang compile it instead of emitting
+                            the object file in-process
+
+build and run options:
+    --parser=<antlr|fast>   parse with the ANTLR generated parser or with the hand-written
+                            Pratt parser, which builds the same tree faster (default: antlr)
+    --parser-cache          keep the ANTLR parser's prediction DFA in the compile cache, so
+                            that every run starts with a warm parser (not with --no-cache)
+    --emit-ll               also write the generated LLVM IR next to the source file, as
+                            <file>.ll or, with --lazy and --tiered, <file>.<function>.ll
+    --opt-level=<level>     optimisation level: 0, 1, 2, 3, s or z (default: 0)
+    --optimize              same as --opt-level=2
+    --march=<native|portable>
+                            generate code for this machine's CPU or for any CPU of the target
+                            architecture (default: portable for build, native for run)
+    --cpu <name>            CPU to generate code for, e.g. skylake (overrides --march)
+    --features <features>   CPU features, e.g. +avx2,+fma (overrides --march)
+    --no-cache              do not read or write the compile cache
+    --cache-max-size <size> compile cache size cap, e.g. 512M (default: $CURE_CACHE_MAX_SIZE
+                            or 256M)
+    --time-passes[=json]    report the wall time, CPU time and peak Python memory of every
+                            compiler phase on stderr, as a table or as JSON (bypasses the
+                            compile cache)
+    --profile-compiler=<file>
+                            sample the compiler's Python stacks and write them to <file> as
+                            collapsed stacks for flamegraph.pl or speedscope (bypasses the
+                            compile cache)
+    --no-daemon             compile in this process even if `cure serve` is running
+    --socket <path>         socket of the compile daemon (default: $CURE_SOCKET or
+                            <cache dir>/serve.sock)
+
+run options:
+    --lazy                  compile each function with ORC the first time it is called
+                            instead of compiling the whole program up front
+    --tiered                compile each function at -O0 when it is first called, then
+                            recompile it at -O3 (or the --opt-level given) in the background
+                            once it gets hot
+    --tier-threshold <n>    calls after which a function is hot (default: 1000)
+    --repeat <n>            call main n times in the same engine and print timing statistics
+                            (min/median/p95/stddev) to stdout
+    --warmup <k>            call main k more times before the timed calls (default: 0)
+    --json                  print the timing statistics as JSON
+
+watch:
+    cure watch [file] [options]
+                            keep the compiler in memory and run the file every time it changes,
+                            recompiling only the functions that changed. Takes the build and
+                            run options other than --lazy, --tiered and the cache options
+    --interval <seconds>    how often to check the file for changes (default: 0.25)
+
+bench:
+    cure bench [directory] [options]
+                            build and time every .cure program in the directory (default:
+                            benchmarks/runtime) and the C program of the same name next to it,
+                            then compare the times with the previous run. Exits with 1 when a
+                            benchmark got slower than the threshold or printed something else
+                            than its C program. Takes the build options, the default
+                            optimisation level is 2
+    --repeat <n>            timed runs of each program (default: 10)
+    --warmup <k>            untimed runs of each program before them (default: 1)
+    --threshold <percent>   slowdown of the fastest run that counts as a regression, when
+                            it is also slower than every run of the previous time (default: 10)
+    --history <file>        JSON file the runs are recorded in (default:
+                            <cache dir>/bench-history.json)
+    --cc <compiler>         C compiler for the baselines (default: clang)
+    --no-baseline           do not build or time the C programs
+    --json                  print the run as JSON
+
+serve options:
+    --socket <path>         socket to listen on
+
+startup-profile:
+    cure startup-profile [action] [args...]
+                            run `cure [action] [args...]` in a fresh interpreter and report the
+                            import time of each module (default action: help)
+
+cache actions:
+    cure cache stats        show the compile cache's location, size and hit rate
+    cure cache clear        remove every compile cache entry
 """
 
 
+DEFAULT_TIER_THRESHOLD = 1000
+DEFAULT_WATCH_INTERVAL = 0.25
+PARSERS = ('antlr', 'fast')
+
+
 @dataclass
 class CompileOptions:
-    optimize: bool
+    opt_level: str = '0'
+    cpu: str = ''
+    features: str = ''
+    via_clang: bool = False
+    linker: str = field(default='clang', metadata={'cache_key': False})
+    emit_ll: bool = field(default=False, metadata={'cache_key': False})
+    # both parsers build the same tree, so the parser does not change the compiler's output
+    parser: str = field(default='antlr', metadata={'cache_key': False})
+    parser_cache: bool = field(default=False, metadata={'cache_key': False})
 
+    def cache_key(self):
+        return dumps({
+            f.name: getattr(self, f.name) for f in fields(self) if f.metadata.get('cache_key', True)
+        }, sort_keys=True)
 
-def parse(scope: ir.Scope, _: CompileOptions):
-    info(f'Compiling {scope.file.as_posix()}')
-    program = CureIRBuilder(scope).build()
 
-    info(f'Parsed {scope.file.as_posix()}')
-    return program
+@dataclass
+class BenchmarkOptions:
+    repeat: int = 1
+    warmup: int = 0
+    json: bool = False
 
-def compile_to_str(scope: ir.Scope, options: CompileOptions):
-    program = parse(scope, options)
-    program = Analyser.run(scope, program)
-    return CodeGeneration.run(scope, cast(ir.Program, program))
 
-def compile_to_ll(scope: ir.Scope, options: CompileOptions):
-    info(f'Compiling {scope.file.as_posix()} to an LLVM IR file (.ll)')
-    code = compile_to_str(scope, options)
-    ll_file = scope.file.with_suffix('.ll')
+def create_scope(file: Path):
+    from cure import ir
+
+    with TIMER.phase('prelude'):
+        return ir.Scope.toplevel(file)
+
+def parse(scope: 'ir.Scope', options: CompileOptions, cache: CompileCache | None = None):
+    if TRACE.parse:
+        trace('parse', f'Compiling {scope.file.as_posix()} with the {options.parser} parser')
+    if options.parser == 'fast':
+        from cure.parser.pratt import PrattParser
+
+        program = PrattParser(scope).build()
+    elif options.parser_cache and cache is not None:
+        from cure.parser.ir_builder import CureIRBuilder
+        from cure.parser import dfa_cache
+
+        dfa_cache.load(cache)
+        program = CureIRBuilder(scope).build()
+        dfa_cache.save(cache)
+    else:
+        from cure.parser.ir_builder import CureIRBuilder
+
+        program = CureIRBuilder(scope).build()
+
+    if TRACE.parse:
+        trace('parse', f'Parsed {scope.file.as_posix()}')
+    return program
+
+def write_ll(ll_file: Path, code: str):
     ll_file.write_text(code)
-    info(f'Wrote to {ll_file.as_posix()}')
+    if TRACE.driver:
+        trace('driver', f'Wrote to {ll_file.as_posix()}')
     return ll_file
 
-def compile_to_exe(scope: ir.Scope, options: CompileOptions):
-    ll_file = compile_to_ll(scope, options)
-    exe_file = scope.file.with_suffix(f'.{scope.target.exe_ext}')
-    info(f'Compiling to executable file {exe_file.as_posix()} using clang')
-    flags: list[str] = []
-    if options.optimize:
-        flags.append('-O2')
+def analyse(scope: 'ir.Scope', options: CompileOptions, cache: CompileCache | None = None):
+    """Parse and analyse `scope`'s source. With a cache, the parsed and the analysed program are
+    kept by source, so a run that only changes code generation options skips the front end"""
+    from cure.passes.analyser import Analyser
+    from cure import ir_cache
+
+    if cache is not None:
+        with TIMER.phase('ir-cache'):
+            program = ir_cache.load(cache, 'analysed', scope)
+            if program is not None:
+                return program
+
+            program = ir_cache.load(cache, 'parsed', scope)
+
+    if cache is None or program is None:
+        program = parse(scope, options, cache)
+        if cache is not None:
+            ir_cache.save(cache, 'parsed', scope, program)
+
+    with TIMER.phase('analyse'):
+        program = cast('ir.Program', Analyser.run(scope, program))
+
+    if cache is not None:
+        ir_cache.save(cache, 'analysed', scope, program)
+
+    return program
+
+def compile_to_str(scope: 'ir.Scope', options: CompileOptions, cache: CompileCache | None = None):
+    from cure.passes.code_generation import CodeGeneration
+
+    program = analyse(scope, options, cache)
+    with TIMER.phase('codegen'):
+        code = CodeGeneration.run(scope, program)
+
+    if options.emit_ll:
+        write_ll(scope.file.with_suffix('.ll'), code)
+
+    return code
+
+def compile_to_ll(scope: 'ir.Scope', options: CompileOptions, cache: CompileCache | None = None):
+    if TRACE.driver:
+        trace('driver', f'Compiling {scope.file.as_posix()} to an LLVM IR file (.ll)')
+    code = compile_to_str(scope, options, cache)
+    ll_file = scope.file.with_suffix('.ll')
+    if options.emit_ll:
+        return ll_file
+
+    return write_ll(ll_file, code)
+
+def compile_to_obj(
+    scope: 'ir.Scope', options: CompileOptions, target_machine: 'llvm.TargetMachine',
+    cache: CompileCache | None = None
+):
+    if TRACE.driver:
+        trace('driver', f'Emitting object code for {scope.file.as_posix()}')
+    code = compile_to_str(scope, options, cache)
+    return emit_object(code, target_machine, options.opt_level)
+
+def get_target_key(options: CompileOptions):
+    """Identify the code generation target without creating a target machine, LLVM's default
+    triple is fixed by the platform and the llvmlite build, which `compiler_version` covers"""
+    return CompileCache.key(options.cache_key(), system(), machine())
+
+def get_object_key(file: Path, options: CompileOptions, reloc: str):
+    return CompileCache.key(
+        file.read_bytes(), compiler_version(), get_target_key(options), reloc
+    )
+
+def get_object(file: Path, options: CompileOptions, cache: CompileCache | None = None):
+    """Get the object code for `file`, on a cache hit the whole compiler pipeline is skipped
+    and LLVM is never loaded"""
+    if cache is None:
+        return compile_to_obj(create_scope(file), options, create_object_target_machine(options))
+
+    key = get_object_key(file, options, 'pic')
+    obj = cache.get(key)
+    if obj is None:
+        obj = compile_to_obj(
+            create_scope(file), options, create_object_target_machine(options), cache
+        )
+        cache.put(key, obj)
+    
+    return obj
+
+def create_object_target_machine(options: CompileOptions):
+    from cure.backend import create_target_machine
+
+    return create_target_machine(options.opt_level, 'pic', options.cpu, options.features)
+
+def get_exe_file(file: Path, target: Target):
+    exe_ext = target.exe_ext
+    return file.with_suffix(f'.{exe_ext}' if exe_ext else '')
+
+def compile_to_exe_via_clang(
+    scope: 'ir.Scope', options: CompileOptions, cache: CompileCache | None = None
+):
+    ll_file = compile_to_ll(scope, options, cache)
+    exe_file = get_exe_file(scope.file, scope.target)
+    if TRACE.driver:
+        trace('driver', f'Compiling to executable file {exe_file.as_posix()} using clang')
+    flags = [f'-O{options.opt_level}']
+    if options.cpu:
+        flags.append(f'-march={options.cpu}')
+    # the same +feature/-feature list the target machine gets, -march alone would let clang
+    # pick its own features for the cpu
+    for feature in filter(None, options.features.split(',')):
+        flags.extend(('-Xclang', '-target-feature', '-Xclang', feature))
     
-    flags_str = ' '.join(flags)
-    run(f'clang {ll_file.absolute().as_posix()} -o {exe_file} {flags_str}')
+    with TIMER.phase('clang'):
+        run(['clang', ll_file.absolute().as_posix(), '-o', exe_file.as_posix(), *flags], check=True)
+
     return exe_file
 
-def jit(scope: ir.Scope, options: CompileOptions):
-    opt = 0 if not options.optimize else 2
+def compile_to_exe(file: Path, options: CompileOptions, cache: CompileCache | None = None):
+    if options.via_clang:
+        return compile_to_exe_via_clang(create_scope(file), options, cache)
+
+    target = Target.get_current()
+    obj_file = file.with_suffix(f'.{target.object_ext}')
+    obj_file.write_bytes(get_object(file, options, cache))
+    if TRACE.driver:
+        trace('driver', f'Wrote to {obj_file.as_posix()}')
+
+    exe_file = get_exe_file(file, target)
+    if TRACE.driver:
+        trace('driver', f'Linking executable file {exe_file.as_posix()}')
+    return link(obj_file, exe_file, target, options.linker)
+
+def compile_to_functions(
+    scope: 'ir.Scope', options: CompileOptions, cache: CompileCache | None = None
+):
+    from cure.passes.code_generation import CodeGeneration
+
+    program = analyse(scope, options, cache)
+    with TIMER.phase('codegen'):
+        modules = CodeGeneration.run_split(scope, program)
+
+    if options.emit_ll:
+        for name, module in modules.items():
+            write_ll(scope.file.with_suffix(f'.{name}.ll'), str(module))
+
+    return modules
+
+def time_main(main) -> tuple[int, float]:
+    start = perf_counter()
+    res = main()
+    end = perf_counter()
+    return res, (end - start) * 1000
+
+def run_main(main_ptr: int, benchmark: BenchmarkOptions | None = None):
+    from ctypes import CFUNCTYPE, c_int
+
+    main = CFUNCTYPE(c_int)(main_ptr)
+
+    if TRACE.driver:
+        trace('driver', 'Running main function')
+    if benchmark is None:
+        res, elapsed = time_main(main)
+        if TRACE.driver:
+            trace('driver', f'Main function executed in {elapsed:.3f}ms and returned {res}')
+        return res
+
+    # the engine is already set up, so none of the samples include compile time
+    res = 0
+    for _ in range(benchmark.warmup):
+        res, _ = time_main(main)
+
+    samples = []
+    for _ in range(benchmark.repeat):
+        res, elapsed = time_main(main)
+        samples.append(elapsed)
+
+    from cure.stats import Summary
+
+    summary = Summary.of(samples, benchmark.warmup)
+    if TRACE.driver:
+        trace(
+            'driver',
+            f'Main function executed {benchmark.repeat} times and returned {res}: {summary.to_json()}'
+        )
 
-    ll_file = compile_to_ll(scope, options)
-    backing_mod = llvm.parse_assembly(ll_file.read_text())
-    target_machine = llvm.Target.from_default_triple().create_target_machine(opt=opt)
-    with llvm.create_mcjit_compiler(backing_mod, target_machine) as engine:
-        engine.finalize_object()
+    flush_c_streams()
+    print(summary.to_json() if benchmark.json else summary, flush=True)
+    return res
 
-        main_ptr = engine.get_function_address('main')
-        main = CFUNCTYPE(c_int)(main_ptr)
+def jit_functions(
+    file: Path, options: CompileOptions, cache: CompileCache | None = None,
+    benchmark: BenchmarkOptions | None = None
+):
+    from cure.backend import create_target_machine
+    from cure.jit import LazyJIT
 
-        info('Running main function')
-        start = perf_counter()
-        res = main()
-        end = perf_counter()
-        info(f'Main function executed in {(end - start) * 1000:.3f}ms and returned {res}')
+    target_machine = create_target_machine(
+        options.opt_level, cpu=options.cpu, features=options.features
+    )
+
+    modules = compile_to_functions(create_scope(file), options, cache)
+    target_key = get_target_key(options)
+    with LazyJIT(target_machine, options.opt_level, modules, cache, target_key) as engine:
+        return run_main(engine.get_address('main'), benchmark)
+
+def jit_tiered(
+    file: Path, options: CompileOptions, cache: CompileCache | None = None,
+    threshold: int = DEFAULT_TIER_THRESHOLD, benchmark: BenchmarkOptions | None = None
+):
+    from cure.backend import create_target_machine
+    from cure.jit import TieredJIT
+
+    hot_opt_level = options.opt_level if options.opt_level != '0' else '3'
+    target_machine = create_target_machine('0', cpu=options.cpu, features=options.features)
+    hot_target_machine = create_target_machine(
+        hot_opt_level, cpu=options.cpu, features=options.features
+    )
+
+    modules = compile_to_functions(create_scope(file), options, cache)
+    target_key = get_target_key(options)
+    with TieredJIT(
+        target_machine, '0', modules, cache, target_key, threshold, hot_opt_level,
+        hot_target_machine
+    ) as engine:
+        return run_main(engine.get_address('main'), benchmark)
+
+def jit(
+    file: Path, options: CompileOptions, cache: CompileCache | None = None, lazy: bool = False,
+    tier_threshold: int | None = None, benchmark: BenchmarkOptions | None = None
+):
+    if tier_threshold is not None:
+        return jit_tiered(file, options, cache, tier_threshold, benchmark)
+
+    if lazy:
+        return jit_functions(file, options, cache, benchmark)
+
+    from llvmlite import binding as llvm
+
+    from cure.backend import create_target_machine, parse_module, optimize_module
+    from cure.cache import JITObjectCache
+
+    target_machine = create_target_machine(
+        options.opt_level, cpu=options.cpu, features=options.features
+    )
+
+    obj = None
+    if cache is not None:
+        key = get_object_key(file, options, 'default')
+        obj = cache.get(key)
+
+    with llvm.create_mcjit_compiler(llvm.parse_assembly(''), target_machine) as engine:
+        if obj is not None:
+            engine.add_object_file(llvm.ObjectFileRef.from_data(obj))
+            engine.finalize_object()
+        else:
+            code = compile_to_str(create_scope(file), options, cache)
+            module = optimize_module(parse_module(code), target_machine, options.opt_level)
+
+            object_cache = None
+            if cache is not None:
+                # even when the source changed, an unchanged optimised module skips codegen
+                object_cache = JITObjectCache(cache, get_target_key(options))
+                object_cache.attach(engine)
+
+            with TIMER.phase('emit'):
+                engine.add_module(module)
+                engine.finalize_object()
+
+            if object_cache is not None and module.name in object_cache.objects:
+                cache.put(key, object_cache.objects[module.name])
+
+        return run_main(engine.get_function_address('main'), benchmark)
 
 
 class CureArgParser:
@@ -86,12 +460,26 @@ class CureArgParser:
             self.__help()
             return
         
+        self.__setup_trace()
+        if self.flag('time-passes') is not None:
+            TIMER.enable()
+
         action = self.args[1]
         match action:
             case 'build':
                 self.__build()
             case 'run':
                 self.__run()
+            case 'watch':
+                self.__watch()
+            case 'bench':
+                self.__bench()
+            case 'cache':
+                self.__cache()
+            case 'serve':
+                self.__serve()
+            case 'startup-profile':
+                self.__startup_profile()
             case 'help':
                 self.__help()
             case _:
@@ -105,9 +493,14 @@ invalid action {action}'""")
         return self.args[arg_index]
     
     def flag(self, name: str):
-        try:
-            i = self.args.index(f'--{name}')
-            if len(self.args) - 1 >= i:
+        for i, arg in enumerate(self.args):
+            if arg.startswith(f'--{name}='):
+                return arg.split('=', 1)[1]
+            
+            if arg != f'--{name}':
+                continue
+
+            if i + 1 >= len(self.args):
                 return True
             
             next_value = self.args[i + 1]
@@ -115,56 +508,303 @@ invalid action {action}'""")
                 return True
             
             return next_value
-        except ValueError:
-            return None
+        
+        return None
     
     def __help(self):
         print(HELP)
-
-    def __build(self):
+    
+    def __setup_trace(self):
+        categories = self.flag('trace')
+        if categories is None:
+            return
+        
+        try:
+            names = parse_categories(categories if isinstance(categories, str) else 'all')
+        except ValueError as e:
+            print(f"""cure [action] --trace=[parse,analyse,codegen,stdlib,jit,cache,driver|all]
+{e}""")
+            sys_exit(1)
+        
+        sink = None
+        if isinstance(trace_file := self.flag('trace-file'), str):
+            sink = open(trace_file, 'w', encoding='utf-8', buffering=1)
+        
+        enable_trace(names, sink)
+    
+    def __get_file(self, action: str):
         file_str = self.get(2)
         if file_str is None:
-            print("""cure build [file]
+            print(f"""cure {action} [file]
 file argument not given""")
             sys_exit(1)
         
         file = Path(file_str)
         if not file.exists():
-            print("""cure build [file]
+            print(f"""cure {action} [file]
 file does not exist""")
             sys_exit(1)
         
         if not file.is_file():
-            print("""cure build [file]
+            print(f"""cure {action} [file]
 file is not a file""")
             sys_exit(1)
         
-        optimize = self.flag('optimize')
-        options = CompileOptions(optimize)
+        return file
+    
+    def __get_options(self, action: str):
+        options = CompileOptions()
+        if self.flag('optimize') is not None:
+            options.opt_level = '2'
+        
+        if (opt_level := self.flag('opt-level')) is not None:
+            if opt_level not in OPT_LEVELS:
+                print(f"""cure {action} [file] --opt-level=[{'|'.join(OPT_LEVELS)}]
+invalid optimisation level""")
+                sys_exit(1)
+            
+            options.opt_level = cast(str, opt_level)
+        
+        # JIT-compiled code only ever runs on this machine, so `run` targets the host by default
+        march = self.flag('march')
+        if march is True:
+            print(f"""cure {action} [file] --march=[native|portable]
+architecture not given""")
+            sys_exit(1)
+        
+        march = march or ('native' if action in ('run', 'watch') else 'portable')
+        match march:
+            case 'native':
+                options.cpu, options.features = get_host_cpu()
+            case 'portable':
+                options.cpu, options.features = '', ''
+            case _:
+                print(f"""cure {action} [file] --march=[native|portable]
+invalid architecture {march}""")
+                sys_exit(1)
+        
+        if isinstance(cpu := self.flag('cpu'), str):
+            options.cpu = cpu
+        
+        if isinstance(features := self.flag('features'), str):
+            options.features = features
+        
+        options.emit_ll = self.flag('emit-ll') is not None
+        if (parser := self.flag('parser')) is not None:
+            if parser not in PARSERS:
+                print(f"""cure {action} [file] --parser=[{'|'.join(PARSERS)}]
+invalid parser {parser}""")
+                sys_exit(1)
+            
+            options.parser = cast(str, parser)
+        
+        options.parser_cache = self.flag('parser-cache') is not None
+        return options
+    
+    def __get_cache(self):
+        # a cache hit skips the front end, which is what writes the --emit-ll output and what
+        # --time-passes measures
+        if any(
+            self.flag(name) is not None
+            for name in ('no-cache', 'emit-ll', 'time-passes', 'profile-compiler')
+        ):
+            return None
+        
+        max_size = self.flag('cache-max-size')
+        return CompileCache(max_size=parse_size(max_size) if isinstance(max_size, str) else None)
+
+    def __get_socket_path(self):
+        from cure.daemon import get_socket_path
+
+        socket_path = self.flag('socket')
+        return Path(socket_path) if isinstance(socket_path, str) else get_socket_path()
+    
+    def __try_daemon(self):
+        if self.flag('no-daemon') is not None:
+            return
+        
+        from cure.daemon import request as daemon_request
 
-        scope = ir.Scope(file)
-        compile_to_exe(scope, options)
+        exit_code = daemon_request(self.__get_socket_path(), self.args)
+        if exit_code is not None:
+            sys_exit(exit_code)
+
+    def __build(self):
+        self.__try_daemon()
+        file = self.__get_file('build')
+
+        options = self.__get_options('build')
+        options.via_clang = self.flag('via-clang') is not None
+        if isinstance(linker := self.flag('linker'), str):
+            options.linker = linker
+
+        with self.__profile_compiler('build'):
+            compile_to_exe(file, options, self.__get_cache())
+        
+        self.__report_time_passes()
     
     def __run(self):
-        file_str = self.get(2)
-        if file_str is None:
-            print("""cure run [file]
-file argument not given""")
+        self.__try_daemon()
+        file = self.__get_file('run')
+
+        options = self.__get_options('run')
+
+        tier_threshold = None
+        if self.flag('tiered') is not None:
+            tier_threshold = self.__get_count('run', 'tier-threshold', 1, DEFAULT_TIER_THRESHOLD)
+
+        with self.__profile_compiler('run'):
+            jit(
+                file, options, self.__get_cache(), self.flag('lazy') is not None, tier_threshold,
+                self.__get_benchmark('run')
+            )
+        
+        self.__report_time_passes()
+    
+    def __watch(self):
+        file = self.__get_file('watch')
+        options = self.__get_options('watch')
+
+        interval = DEFAULT_WATCH_INTERVAL
+        if isinstance(interval_str := self.flag('interval'), str):
+            try:
+                interval = float(interval_str)
+            except ValueError:
+                interval = -1.0
+
+            if interval <= 0:
+                print("""cure watch [file] --interval <seconds>
+--interval must be a positive number of seconds""")
+                sys_exit(1)
+        
+        from cure.watch import Watcher
+
+        Watcher(file, options, self.__get_benchmark('watch'), interval).watch()
+    
+    def __bench(self):
+        from cure.bench import BenchmarkSuite, BENCHMARKS_PATH, DEFAULT_REPEAT, DEFAULT_WARMUP,\
+            DEFAULT_THRESHOLD
+
+        directory = BENCHMARKS_PATH
+        if (directory_str := self.get(2)) is not None and not directory_str.startswith('-'):
+            directory = Path(directory_str)
+        
+        if not directory.is_dir():
+            print("""cure bench [directory]
+directory does not exist""")
             sys_exit(1)
         
-        file = Path(file_str)
-        if not file.exists():
-            print("""cure run [file]
-file does not exist""")
+        options = self.__get_options('bench')
+        if self.flag('opt-level') is None and self.flag('optimize') is None:
+            options.opt_level = '2'
+        
+        if isinstance(linker := self.flag('linker'), str):
+            options.linker = linker
+        
+        threshold = DEFAULT_THRESHOLD
+        if isinstance(threshold_str := self.flag('threshold'), str):
+            try:
+                threshold = float(threshold_str)
+            except ValueError:
+                threshold = -1.0
+            
+            if threshold < 0:
+                print("""cure bench [directory] --threshold <percent>
+--threshold must be a positive percentage""")
+                sys_exit(1)
+        
+        cc = self.flag('cc')
+        cc = cc if isinstance(cc, str) else 'clang'
+        if self.flag('no-baseline') is not None:
+            cc = None
+        
+        history = self.flag('history')
+        suite = BenchmarkSuite(
+            directory, options, self.__get_cache(), cc,
+            self.__get_count('bench', 'repeat', 1, DEFAULT_REPEAT),
+            self.__get_count('bench', 'warmup', 0, DEFAULT_WARMUP), threshold,
+            Path(history) if isinstance(history, str) else None
+        )
+        if suite.run(self.flag('json') is not None):
             sys_exit(1)
+    
+    def __get_benchmark(self, action: str):
+        if self.flag('repeat') is None and self.flag('warmup') is None:
+            return None
         
-        if not file.is_file():
-            print("""cure run [file]
-file is not a file""")
+        return BenchmarkOptions(
+            self.__get_count(action, 'repeat', 1), self.__get_count(action, 'warmup', 0),
+            self.flag('json') is not None
+        )
+    
+    @contextmanager
+    def __profile_compiler(self, action: str):
+        profile_file = self.flag('profile-compiler')
+        if profile_file is None:
+            yield
+            return
+        
+        if not isinstance(profile_file, str):
+            print(f"""cure {action} [file] --profile-compiler=<file>
+output file not given""")
+            sys_exit(1)
+        
+        from cure.profiler import SamplingProfiler
+
+        profiler = SamplingProfiler()
+        try:
+            with profiler:
+                yield
+        finally:
+            profiler.write_folded(Path(profile_file))
+            print(f'Wrote {profiler.samples} samples to {profile_file}', file=stderr, flush=True)
+    
+    def __report_time_passes(self):
+        time_passes = self.flag('time-passes')
+        if time_passes is None:
+            return
+        
+        flush_c_streams()
+        print(TIMER.to_json() if time_passes == 'json' else TIMER, file=stderr, flush=True)
+    
+    def __get_count(self, action: str, name: str, minimum: int, default: int | None = None):
+        value = self.flag(name)
+        if not isinstance(value, str):
+            return minimum if default is None else default
+        
+        if not value.isdigit() or int(value) < minimum:
+            target = '[directory]' if action == 'bench' else '[file]'
+            print(f"""cure {action} {target} --{name} <n>
+--{name} must be a whole number of at least {minimum}""")
             sys_exit(1)
         
-        optimize = self.flag('optimize')
-        options = CompileOptions(optimize)
+        return int(value)
+    
+    def __cache(self):
+        cache = self.__get_cache() or CompileCache()
+        match self.get(2):
+            case 'stats':
+                print(f'location: {cache.path.as_posix()}')
+                print(cache.stats())
+            case 'clear':
+                cache.clear()
+                print(f'Cleared {cache.path.as_posix()}')
+            case _:
+                print("""cure cache [stats|clear]
+invalid cache action""")
+                sys_exit(1)
+    
+    def __serve(self):
+        from cure.daemon import CompileDaemon, is_supported as daemon_supported
+
+        if not daemon_supported():
+            print("""cure serve
+the compile daemon needs Unix sockets and fork(), which this platform does not have""")
+            sys_exit(1)
         
-        scope = ir.Scope(file)
-        jit(scope, options)
+        CompileDaemon(self.__get_socket_path()).serve()
+    
+    def __startup_profile(self):
+        from cure.startup import profile_imports, format_import_times
+
+        print(format_import_times(profile_imports(self.args[2:] or ['help'])))
@@ -0,0 +1,125 @@
+from typing import TYPE_CHECKING
+from subprocess import run
+from ctypes import CDLL
+from pathlib import Path
+
+from cure.target import Target
+from cure.timing import TIMER
+from cure.trace import TRACE, trace
+
+
+# llvmlite.binding loads the LLVM shared library, it is only imported by the functions that need
+# it so that cache hits, `cure help` and friends never pay for it
+if TYPE_CHECKING:
+    from llvmlite import binding as llvm
+
+
+_llvm_initialised = False
+
+
+def init_llvm():
+    global _llvm_initialised
+    if _llvm_initialised:
+        return
+
+    from llvmlite import binding as llvm
+
+    if TRACE.driver:
+        trace('driver', 'Initialising LLVM')
+
+    llvm.initialize()
+    llvm.initialize_native_target()
+    llvm.initialize_native_asmprinter()
+
+    _llvm_initialised = True
+
+OPT_LEVELS = ('0', '1', '2', '3', 's', 'z')
+
+
+def get_speed_level(opt_level: str):
+    return 2 if opt_level in ('s', 'z') else int(opt_level)
+
+def get_host_cpu():
+    """The host's CPU name and feature string, e.g. `znver3` and `+avx2,+fma,...`"""
+    from llvmlite import binding as llvm
+
+    init_llvm()
+    return llvm.get_host_cpu_name(), llvm.get_host_cpu_features().flatten()
+
+def create_target_machine(
+    opt_level: str = '2', reloc: str = 'default', cpu: str = '', features: str = ''
+):
+    from llvmlite import binding as llvm
+
+    init_llvm()
+    target = llvm.Target.from_default_triple()
+    return target.create_target_machine(
+        cpu=cpu, features=features, opt=get_speed_level(opt_level), reloc=reloc
+    )
+
+def optimize_module(
+    module: 'llvm.ModuleRef', target_machine: 'llvm.TargetMachine', opt_level: str
+):
+    """Run LLVM's default module pass pipeline for `opt_level` (0, 1, 2, 3, s or z) in-process"""
+    from llvmlite import binding as llvm
+
+    speed_level = get_speed_level(opt_level)
+    if speed_level == 0:
+        return module
+
+    optimize_size = opt_level in ('s', 'z')
+
+    # llvmlite 0.44 aborts when asked for the size level 1 (-Os) pipeline, so -Os is the -O2
+    # pipeline without the transforms that grow code, -Oz is LLVM's own size pipeline
+    pto = llvm.create_pipeline_tuning_options(speed_level, 2 if opt_level == 'z' else 0)
+    pto.loop_unrolling = not optimize_size
+    pto.loop_interleaving = speed_level > 1 and not optimize_size
+    pto.loop_vectorization = speed_level > 1 and not optimize_size
+    pto.slp_vectorization = speed_level > 1 and not optimize_size
+
+    with TIMER.phase('optimise'):
+        pass_builder = llvm.create_pass_builder(target_machine, pto)
+        pass_builder.getModulePassManager().run(module, pass_builder)
+
+    return module
+
+def parse_module(code: str):
+    from llvmlite import binding as llvm
+
+    init_llvm()
+    with TIMER.phase('llvm-parse'):
+        module = llvm.parse_assembly(code)
+        module.verify()
+
+    return module
+
+def emit_object(code: str, target_machine: 'llvm.TargetMachine', opt_level: str):
+    """Parse the generated IR once, optimise it and emit a native object file"""
+    module = parse_module(code)
+    module.triple = target_machine.triple
+    optimize_module(module, target_machine, opt_level)
+    with TIMER.phase('emit'):
+        return target_machine.emit_object(module)
+
+def link(obj_file: Path, exe_file: Path, target: Target, linker: str = 'clang'):
+    """Link an object file into an executable, the linker does not compile anything"""
+    cmd = [linker, obj_file.absolute().as_posix(), '-o', exe_file.absolute().as_posix()]
+    if target == Target.Linux:
+        # floorf, powf, sqrtf, ... live in libm
+        cmd.append('-lm')
+
+    if TRACE.driver:
+        trace('driver', f'Linking with {" ".join(cmd)}')
+    with TIMER.phase('link'):
+        run(cmd, check=True)
+
+    return exe_file
+
+def flush_c_streams():
+    """Flush the C runtime's stdio buffers, JIT-compiled code writes through them rather than
+    through Python's sys.stdout"""
+    try:
+        libc = CDLL('msvcrt') if Target.get_current() == Target.Windows else CDLL(None)
+        libc.fflush(None)
+    except (OSError, AttributeError):
+        pass
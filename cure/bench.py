@@ -0,0 +1,251 @@
+"""Runtime benchmarks: build every Cure program in a directory together with the C program of
+the same name next to it, time both executables and compare the Cure times with the previous
+run, which is kept in a JSON history file."""
+from tempfile import TemporaryDirectory
+from dataclasses import dataclass, asdict
+from subprocess import run, PIPE
+from datetime import datetime
+from time import perf_counter
+from pathlib import Path
+from shutil import copy
+from json import dumps, loads
+import sys
+
+from cure.cache import CompileCache, compiler_version, get_cache_dir
+from cure.stats import Summary
+from cure.target import Target
+from cure.trace import TRACE, trace
+from cure import CompileOptions, compile_to_exe, get_exe_file
+
+
+BENCHMARKS_PATH = Path(__file__).parent.parent.absolute() / 'benchmarks' / 'runtime'
+# the fastest of the timed runs is compared, it is the one least disturbed by the rest of the
+# machine, but a whole process still varies by a few percent from run to run
+DEFAULT_THRESHOLD = 10.0
+DEFAULT_REPEAT = 10
+DEFAULT_WARMUP = 1
+# runs kept in the history file, per set of compile options
+HISTORY_LIMIT = 100
+# --opt-level -> the C compiler flag with the same intent
+C_OPT_FLAGS = {'0': '-O0', '1': '-O1', '2': '-O2', '3': '-O3', 's': '-Os', 'z': '-Oz'}
+
+
+def get_history_path():
+    return get_cache_dir() / 'bench-history.json'
+
+
+@dataclass
+class Benchmark:
+    name: str
+    source: Path
+    baseline: Path | None
+
+
+@dataclass
+class Result:
+    name: str
+    cure: Summary
+    c: Summary | None = None
+    # whether the Cure program printed the same as its baseline
+    output_matches: bool | None = None
+
+    def to_dict(self):
+        return {
+            'cure': asdict(self.cure), 'c': asdict(self.c) if self.c is not None else None,
+            'output_matches': self.output_matches
+        }
+
+
+def find_benchmarks(directory: Path):
+    benchmarks = []
+    for source in sorted(directory.glob('*.cure')):
+        baseline = source.with_suffix('.c')
+        benchmarks.append(Benchmark(source.stem, source, baseline if baseline.exists() else None))
+
+    return benchmarks
+
+def time_executable(exe_file: Path, repeat: int, warmup: int):
+    """Run `exe_file` `warmup` + `repeat` times and return its output and the timed runs"""
+    cmd = [exe_file.absolute().as_posix()]
+    output = ''
+    for _ in range(warmup):
+        output = run(cmd, stdout=PIPE, text=True, check=True).stdout
+
+    samples = []
+    for _ in range(repeat):
+        start = perf_counter()
+        output = run(cmd, stdout=PIPE, text=True, check=True).stdout
+        samples.append((perf_counter() - start) * 1000)
+
+    return output, Summary.of(samples, warmup)
+
+def get_change(time: float, previous_time: float):
+    """Relative change in percent, positive when `time` is slower"""
+    return (time - previous_time) / previous_time * 100
+
+
+class BenchmarkSuite:
+    """Builds and times the benchmarks of one directory.
+
+    Every run is appended to the history file with the compile options it used, and its Cure
+    times are compared with the last run that used the same options. A benchmark whose fastest
+    time grew by more than `threshold` percent and is slower than every time of that run is a
+    regression."""
+
+    def __init__(
+        self, directory: Path, options: CompileOptions, cache: CompileCache | None = None,
+        cc: str | None = 'clang', repeat: int = DEFAULT_REPEAT, warmup: int = DEFAULT_WARMUP,
+        threshold: float = DEFAULT_THRESHOLD, history_file: Path | None = None
+    ):
+        self.directory = directory
+        self.options = options
+        self.cache = cache
+        self.cc = cc
+        self.repeat = repeat
+        self.warmup = warmup
+        self.threshold = threshold
+        self.history_file = history_file or get_history_path()
+
+    def build_cure(self, benchmark: Benchmark, build_dir: Path):
+        # built in a temporary directory, compile_to_exe writes its files next to the source
+        source = build_dir / benchmark.source.name
+        copy(benchmark.source, source)
+        return compile_to_exe(source, self.options, self.cache)
+
+    def build_c(self, benchmark: Benchmark, build_dir: Path):
+        if benchmark.baseline is None or self.cc is None:
+            return None
+
+        target = Target.get_current()
+        exe_file = get_exe_file(build_dir / f'{benchmark.name}_c', target)
+        cmd = [
+            self.cc, benchmark.baseline.absolute().as_posix(), '-o', exe_file.as_posix(),
+            C_OPT_FLAGS[self.options.opt_level]
+        ]
+        if self.options.cpu:
+            cmd.append(f'-march={self.options.cpu}')
+        if target == Target.Linux:
+            cmd.append('-lm')
+
+        if TRACE.driver:
+            trace('driver', f'Compiling the baseline with {" ".join(cmd)}')
+        run(cmd, check=True)
+        return exe_file
+
+    def run_benchmark(self, benchmark: Benchmark, build_dir: Path):
+        if TRACE.driver:
+            trace('driver', f'Benchmarking {benchmark.source.as_posix()}')
+        output, summary = time_executable(
+            self.build_cure(benchmark, build_dir), self.repeat, self.warmup
+        )
+        result = Result(benchmark.name, summary)
+
+        if (c_exe_file := self.build_c(benchmark, build_dir)) is not None:
+            c_output, result.c = time_executable(c_exe_file, self.repeat, self.warmup)
+            result.output_matches = output == c_output
+
+        return result
+
+    def load_history(self) -> list[dict]:
+        try:
+            return loads(self.history_file.read_text('utf-8'))
+        except (OSError, ValueError):
+            return []
+
+    def save_history(self, history: list[dict]):
+        self.history_file.parent.mkdir(parents=True, exist_ok=True)
+        self.history_file.write_text(dumps(history, indent=1), 'utf-8')
+
+    def get_previous(self, history: list[dict]):
+        options = self.options.cache_key()
+        for entry in reversed(history):
+            if entry['options'] == options:
+                return entry
+
+        return None
+
+    def get_regressions(self, results: list[Result], previous: dict | None):
+        if previous is None:
+            return []
+
+        regressions = []
+        for result in results:
+            if (previous_result := previous['results'].get(result.name)) is None:
+                continue
+
+            # a slowdown within the spread of the previous run's times is noise
+            change = get_change(result.cure.min, previous_result['cure']['min'])
+            if change > self.threshold and result.cure.min > previous_result['cure']['max']:
+                regressions.append(result.name)
+
+        return regressions
+
+    def format_results(self, results: list[Result], previous: dict | None, regressions: list[str]):
+        lines = [
+            f'{"benchmark":<16} {"cure":>11} {"c":>11} {"cure/c":>7} {"previous":>11} {"change":>8}'
+        ]
+        for result in results:
+            line = f'{result.name:<16} {result.cure.min:>9.2f}ms'
+            if result.c is not None:
+                line += f' {result.c.min:>9.2f}ms {result.cure.min / result.c.min:>6.2f}x'
+            else:
+                line += f' {"-":>11} {"-":>7}'
+
+            previous_result = previous['results'].get(result.name) if previous else None
+            if previous_result is not None:
+                previous_time = previous_result['cure']['min']
+                change = get_change(result.cure.min, previous_time)
+                line += f' {previous_time:>9.2f}ms {change:>+7.1f}%'
+            else:
+                line += f' {"-":>11} {"-":>8}'
+
+            if result.name in regressions:
+                line += '  regression'
+            if result.output_matches is False:
+                line += '  output differs from the baseline'
+            lines.append(line)
+
+        if previous is None:
+            lines.append('no previous run with these options to compare with')
+        else:
+            lines.append(
+                f'compared with the run of {previous["date"]}, '\
+                    f'{len(regressions)} regressions over {self.threshold:g}%'
+            )
+
+        return '\n'.join(lines)
+
+    def run(self, json: bool = False):
+        """Run every benchmark, record the run and return the names of the benchmarks that
+        regressed or whose output differs from their baseline"""
+        benchmarks = find_benchmarks(self.directory)
+        if not benchmarks:
+            print(f'cure bench: no .cure files in {self.directory.as_posix()}', file=sys.stderr)
+            return []
+
+        with TemporaryDirectory() as build_dir:
+            results = [self.run_benchmark(benchmark, Path(build_dir)) for benchmark in benchmarks]
+
+        history = self.load_history()
+        previous = self.get_previous(history)
+        regressions = self.get_regressions(results, previous)
+
+        entry = {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'compiler': compiler_version(),
+            'options': self.options.cache_key(),
+            'results': {result.name: result.to_dict() for result in results},
+            'regressions': regressions
+        }
+        history.append(entry)
+        same_options = [e for e in history if e['options'] == entry['options']]
+        if len(same_options) > HISTORY_LIMIT:
+            history.remove(same_options[0])
+
+        self.save_history(history)
+
+        print(dumps(entry) if json else self.format_results(results, previous, regressions))
+        return regressions + [
+            result.name for result in results
+            if result.output_matches is False and result.name not in regressions
+        ]
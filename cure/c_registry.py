@@ -1,9 +1,8 @@
-from logging import info
-
 from llvmlite import ir as lir
 
 from cure.target import Target
 from cure import ir
+from cure.trace import TRACE, trace
 
 
 class CRegistry:
@@ -51,7 +50,7 @@ class CRegistry:
             lir.IntType(64) # size
         ]))
 
-        self.register('memcmp', lir.FunctionType(lir.IntType(1), [
+        self.register('memcmp', lir.FunctionType(lir.IntType(32), [
             lir.IntType(8).as_pointer(), # lhs
             lir.IntType(8).as_pointer(), # rhs
             lir.IntType(64) # count
@@ -108,8 +107,9 @@ class CRegistry:
             stream_type # stream
         ]))
 
-        registered_functions_str = ', '.join(self.get_registered_functions())
-        info(f'Registered: {registered_functions_str}')
+        if TRACE.codegen:
+            registered_functions_str = ', '.join(self.get_registered_functions())
+            trace('codegen', f'Registered: {registered_functions_str}')
     
     def get(self, name: str):
         if name not in self.__registry:
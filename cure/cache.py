@@ -0,0 +1,273 @@
+from os import environ, replace, utime, getpid
+from dataclasses import dataclass
+from atexit import register
+from threading import get_ident
+from hashlib import sha256
+from pathlib import Path
+from json import dumps, loads
+
+from cure.trace import TRACE, trace
+
+
+PACKAGE_PATH = Path(__file__).parent.absolute()
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+# an eviction frees space down to this share of the maximum size, so that a full cache is not
+# scanned again on every write
+EVICT_TARGET = 0.9
+
+_compiler_version: str | None = None
+# stats file -> the lookups this process counted in that cache and has not written yet
+_pending_counters: dict[Path, dict[str, int]] = {}
+
+
+def parse_size(size: str):
+    """Parse a size such as `4096`, `512K`, `256M` or `1G` into a number of bytes"""
+    size = size.strip().upper().removesuffix('B')
+    unit = size[-1] if size and size[-1] in SIZE_UNITS else ''
+    return int(float(size.removesuffix(unit)) * SIZE_UNITS[unit])
+
+def format_size(size: float):
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:
+            return f'{size:.1f}{unit}'
+
+        size /= 1024
+
+    return f'{size:.1f}GiB'
+
+def write_atomic(path: Path, data: bytes):
+    """Write `data` to a temporary file and rename it over `path`, so that other processes
+    either see the old file or the whole new one"""
+    tmp = path.with_name(f'{path.name}.{getpid()}.{get_ident()}.tmp')
+    tmp.write_bytes(data)
+    replace(tmp, path)
+
+def read_counters(stats_path: Path) -> dict[str, int]:
+    try:
+        return loads(stats_path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+@register
+def flush_counters():
+    """Add the lookups counted by this process to the stats files of their caches. Runs once
+    when the process exits instead of on every lookup, under a lock where the platform has
+    flock, and the file is replaced whole so that it is never read half written"""
+    try:
+        from fcntl import flock, LOCK_EX
+    except ImportError:
+        flock = None
+
+    for stats_path, pending in _pending_counters.items():
+        try:
+            stats_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(stats_path.with_name('stats.lock'), 'a') as lock:
+                if flock is not None:
+                    flock(lock.fileno(), LOCK_EX)
+
+                counters = read_counters(stats_path)
+                for counter, count in pending.items():
+                    counters[counter] = counters.get(counter, 0) + count
+
+                write_atomic(stats_path, dumps(counters).encode('utf-8'))
+        except OSError:
+            pass
+
+    _pending_counters.clear()
+
+def get_cache_dir():
+    if (cache_dir := environ.get('CURE_CACHE_DIR')) is not None:
+        return Path(cache_dir)
+
+    if (local_app_data := environ.get('LOCALAPPDATA')) is not None:
+        return Path(local_app_data) / 'cure' / 'cache'
+
+    xdg_cache_home = environ.get('XDG_CACHE_HOME')
+    base = Path(xdg_cache_home) if xdg_cache_home else Path.home() / '.cache'
+    return base / 'cure'
+
+def compiler_version():
+    """Identify the compiler build: the llvmlite version plus the state of every compiler source
+    file, so that editing the compiler invalidates everything it produced before"""
+    global _compiler_version
+    if _compiler_version is not None:
+        return _compiler_version
+
+    # only llvmlite's version module, importing llvmlite.binding would load LLVM itself
+    from llvmlite import __version__ as llvmlite_version
+
+    h = sha256(llvmlite_version.encode())
+    for file in sorted(PACKAGE_PATH.rglob('*.py')):
+        stat = file.stat()
+        name = file.relative_to(PACKAGE_PATH).as_posix()
+        h.update(f'{name}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+
+    _compiler_version = h.hexdigest()
+    return _compiler_version
+
+
+@dataclass
+class CacheStats:
+    entries: int
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+
+    def __str__(self):
+        lookups = self.hits + self.misses
+        hit_rate = f'{self.hits / lookups * 100:.1f}%' if lookups else 'n/a'
+        return f"""entries:  {self.entries}
+size:     {format_size(self.size)} / {format_size(self.max_size)}
+hits:     {self.hits}
+misses:   {self.misses}
+hit rate: {hit_rate}"""
+
+class CompileCache:
+    """Content-addressed on-disk cache of compiler outputs.
+
+    Entries are evicted least-recently-used first once the cache grows over `max_size`, an
+    entry's modification time doubles as its last use time. The size of the cache is counted
+    once and then kept up to date with this instance's writes, so entries written by other
+    processes are only noticed by the next eviction."""
+
+    def __init__(self, path: Path | None = None, max_size: int | None = None):
+        self.path = path or get_cache_dir()
+        if max_size is None:
+            max_size = parse_size(environ.get('CURE_CACHE_MAX_SIZE', str(DEFAULT_MAX_SIZE)))
+
+        self.max_size = max_size
+        self.entries_path = self.path / 'entries'
+        self.stats_path = self.path / 'stats.json'
+        self._size: int | None = None
+
+    @staticmethod
+    def key(*parts: str | bytes):
+        h = sha256()
+        for part in parts:
+            data = part.encode('utf-8') if isinstance(part, str) else part
+            h.update(len(data).to_bytes(8, 'little'))
+            h.update(data)
+
+        return h.hexdigest()
+
+    def _entry(self, key: str):
+        return self.entries_path / key
+
+    def get(self, key: str):
+        entry = self._entry(key)
+        try:
+            data = entry.read_bytes()
+        except OSError:
+            if TRACE.cache:
+                trace('cache', f'Cache miss {key}')
+            self._count('misses')
+            return None
+
+        if TRACE.cache:
+            trace('cache', f'Cache hit {key}')
+        utime(entry)
+        self._count('hits')
+        return data
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_size:
+            return
+
+        self.entries_path.mkdir(parents=True, exist_ok=True)
+        entry = self._entry(key)
+        try:
+            replaced_size = entry.stat().st_size
+        except OSError:
+            replaced_size = 0
+
+        write_atomic(entry, data)
+        if TRACE.cache:
+            trace('cache', f'Cached {key} ({format_size(len(data))})')
+
+        if self._size is not None:
+            self._size += len(data) - replaced_size
+        if self._size is None or self._size > self.max_size:
+            self.evict()
+
+    def _entries(self):
+        if not self.entries_path.is_dir():
+            return []
+
+        entries = []
+        for entry in self.entries_path.iterdir():
+            try:
+                entries.append((entry, entry.stat()))
+            except OSError:
+                continue
+
+        return entries
+
+    def evict(self):
+        entries = self._entries()
+        size = sum(stat.st_size for _, stat in entries)
+        if size > self.max_size:
+            entries.sort(key=lambda entry: entry[1].st_mtime_ns)
+            for entry, stat in entries:
+                if size <= self.max_size * EVICT_TARGET:
+                    break
+
+                entry.unlink(missing_ok=True)
+                size -= stat.st_size
+                if TRACE.cache:
+                    trace('cache', f'Evicted {entry.name} from the cache')
+
+        self._size = size
+
+    def _count(self, counter: str):
+        pending = _pending_counters.setdefault(self.stats_path, {})
+        pending[counter] = pending.get(counter, 0) + 1
+
+    def stats(self):
+        entries = self._entries()
+        counters = read_counters(self.stats_path)
+        for counter, count in _pending_counters.get(self.stats_path, {}).items():
+            counters[counter] = counters.get(counter, 0) + count
+
+        return CacheStats(
+            len(entries), sum(stat.st_size for _, stat in entries), self.max_size,
+            counters.get('hits', 0), counters.get('misses', 0)
+        )
+
+    def clear(self):
+        for entry, _ in self._entries():
+            entry.unlink(missing_ok=True)
+
+        self.stats_path.unlink(missing_ok=True)
+        _pending_counters.pop(self.stats_path, None)
+        self._size = 0
+
+class JITObjectCache:
+    """MCJIT object cache backed by a `CompileCache`.
+
+    Entries are keyed by the optimised IR of a module and the target machine it is compiled for,
+    so identical modules skip native code generation even when the source file changed."""
+
+    def __init__(self, cache: CompileCache, target_key: str):
+        self.cache = cache
+        self.target_key = target_key
+        self.objects: dict[str, bytes] = {}
+
+    def key(self, module):
+        return CompileCache.key('jit', compiler_version(), self.target_key, str(module))
+
+    def attach(self, engine):
+        engine.set_object_cache(self.notify, self.getbuffer)
+
+    def getbuffer(self, module):
+        key = self.key(module)
+        obj = self.cache.get(key)
+        if obj is not None:
+            self.objects[module.name] = obj
+        
+        return obj
+
+    def notify(self, module, buffer: bytes):
+        self.objects[module.name] = buffer
+        self.cache.put(self.key(module), buffer)
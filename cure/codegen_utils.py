@@ -21,13 +21,21 @@ def zero(int_width: int):
     """Returns an integer constant with the given width with a value of 0"""
     return ir.Constant(ir.IntType(int_width), 0)
 
+def one(int_width: int):
+    """Returns an integer constant with the given width with a value of 1"""
+    return ir.Constant(ir.IntType(int_width), 1)
+
 def float_zero():
     """Returns a float constant with the value 0.0"""
     return ir.Constant(ir.FloatType(), 0.0)
 
 def store_in_pointer(builder: ir.IRBuilder, type: ir.Type, value: ir.Value, name: str = ''):
     """Stores a value in as a pointer"""
-    ptr = builder.alloca(type, name=name)
+    # allocated in the entry block, so that a value stored in a loop reuses one stack slot
+    # instead of growing the stack on every iteration
+    with builder.goto_entry_block():
+        ptr = builder.alloca(type, name=name)
+
     builder.store(value, ptr)
     return ptr
 
@@ -0,0 +1,248 @@
+from signal import signal, SIGINT, SIGTERM, SIG_DFL
+from threading import Thread
+from tempfile import mkdtemp
+from shutil import rmtree
+from pathlib import Path
+from json import dumps, loads
+from os import environ
+import socket
+import struct
+import sys
+import os
+
+from cure.cache import get_cache_dir
+from cure.trace import TRACE, trace
+
+
+MAX_MESSAGE_SIZE = 1024 * 1024
+# seconds a client has to send its request, requests are received one at a time before the fork
+REQUEST_TIMEOUT = 5.0
+WARMUP_PROGRAM = """fn square(float x) -> float {
+    return x * x
+}
+
+fn main() -> int {
+    mut i = 0
+    while i < 3 {
+        i += 1
+    }
+
+    s = "a" + i.to_string()
+    if i == 3 && i > 1 {
+        print(s)
+    } else if i > 2 {
+        print((float)i)
+    } else {
+        print(square(2.0) if i >= 1 else 0.0)
+    }
+
+    return 0
+}
+"""
+
+
+def is_supported():
+    return hasattr(socket, 'AF_UNIX') and hasattr(socket, 'send_fds') and hasattr(os, 'fork')
+
+def get_peer_uid(conn: socket.socket):
+    """The user id of the process at the other end of `conn`, None if the platform cannot tell"""
+    if hasattr(socket, 'SO_PEERCRED'):
+        # struct ucred {pid_t pid; uid_t uid; gid_t gid;}
+        creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+        return struct.unpack('3i', creds)[1]
+
+    if sys.platform == 'darwin' or 'bsd' in sys.platform:
+        # getsockopt(SOL_LOCAL, LOCAL_PEERCRED), struct xucred {u_int version; uid_t uid; ...}
+        creds = conn.getsockopt(0, 1, struct.calcsize('2I'))
+        return struct.unpack('2I', creds[:struct.calcsize('2I')])[1]
+
+    return None
+
+def get_socket_path():
+    if (socket_path := environ.get('CURE_SOCKET')) is not None:
+        return Path(socket_path)
+
+    return get_cache_dir() / 'serve.sock'
+
+def request(socket_path: Path, args: list[str]):
+    """Ask a running `cure serve` daemon to handle `args`, the daemon writes straight to this
+    process' stdin/stdout/stderr. Returns the exit code, or None if no daemon is listening"""
+    if not is_supported() or not socket_path.exists():
+        return None
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path.as_posix())
+        except OSError:
+            return None
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        message = dumps({
+            'args': args, 'cwd': os.getcwd(), 'env': dict(environ)
+        }).encode('utf-8') + b'\n'
+        socket.send_fds(client, [message], [0, 1, 2])
+
+        response = b''
+        while not response.endswith(b'\n'):
+            chunk = client.recv(4096)
+            if not chunk:
+                return None
+
+            response += chunk
+
+    return int(loads(response)['exit_code'])
+
+
+class CompileDaemon:
+    """Long-running compiler process that answers `build` and `run` requests over a Unix socket.
+
+    Imports, LLVM initialisation, the prelude scope and the ANTLR prediction cache are set up once
+    in this process, then every request is handled in a forked child. Children inherit that warm
+    state, and a crash or an `exit()` in JIT-compiled code cannot take the daemon down.
+
+    A request runs with the daemon's user, so only connections from that user are accepted, and
+    the socket and the directory it creates for it are only open to that user."""
+
+    def __init__(self, socket_path: Path):
+        self.socket_path = socket_path
+
+    def warm_up(self):
+        from cure.backend import init_llvm
+        from cure import ir, compile_to_str, CompileOptions
+
+        init_llvm()
+        ir.Scope.keep_prelude()
+
+        # compile a small program so the parser's prediction DFA and every pass' code paths are
+        # warm before the first real request is forked off
+        warmup_dir = Path(mkdtemp(prefix='cure-serve-'))
+        try:
+            file = warmup_dir / 'warmup.cure'
+            file.write_text(WARMUP_PROGRAM, 'utf-8')
+            compile_to_str(ir.Scope.toplevel(file), CompileOptions())
+        finally:
+            rmtree(warmup_dir, ignore_errors=True)
+
+        if TRACE.driver:
+            trace('driver', 'Daemon warmed up')
+
+    def serve(self):
+        self.warm_up()
+        signal(SIGTERM, lambda *_: sys.exit(0))
+
+        self.socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self.socket_path.unlink(missing_ok=True)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            # created as 0600 instead of changing its mode after it is already listening
+            umask = os.umask(0o177)
+            try:
+                server.bind(self.socket_path.as_posix())
+            finally:
+                os.umask(umask)
+
+            server.listen()
+            print(f'cure serve: listening on {self.socket_path.as_posix()}')
+            sys.stdout.flush()
+
+            try:
+                while True:
+                    conn, _ = server.accept()
+                    self.handle(conn)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                self.socket_path.unlink(missing_ok=True)
+
+    def handle(self, conn: socket.socket):
+        try:
+            peer_uid = get_peer_uid(conn)
+        except OSError:
+            peer_uid = None
+
+        if peer_uid != os.getuid():
+            if TRACE.driver:
+                trace('driver', f'Rejected a connection from user {peer_uid}')
+            conn.close()
+            return
+
+        fds: list[int] = []
+        try:
+            conn.settimeout(REQUEST_TIMEOUT)
+            message, fds, _, _ = socket.recv_fds(conn, MAX_MESSAGE_SIZE, 3)
+            while not message.endswith(b'\n'):
+                chunk = conn.recv(MAX_MESSAGE_SIZE)
+                if not chunk:
+                    raise ConnectionError('incomplete request')
+
+                message += chunk
+
+            req = loads(message)
+            conn.settimeout(None)
+        except (OSError, ValueError) as e:
+            if TRACE.driver:
+                trace('driver', f'Dropped invalid request: {e}')
+            for fd in fds:
+                os.close(fd)
+
+            conn.close()
+            return
+
+        if TRACE.driver:
+            trace('driver', f'Request {req["args"]}')
+        pid = os.fork()
+        if pid == 0:
+            conn.close()
+            os._exit(self.run_child(req['args'], req['cwd'], req['env'], fds))
+
+        for fd in fds:
+            os.close(fd)
+
+        Thread(target=self.reply, args=(conn, pid), daemon=True).start()
+
+    @staticmethod
+    def run_child(args: list[str], cwd: str, env: dict[str, str], fds: list[int]):
+        from cure.backend import flush_c_streams
+        from cure.cache import flush_counters
+        from cure import CureArgParser
+
+        signal(SIGINT, SIG_DFL)
+        signal(SIGTERM, SIG_DFL)
+        environ.clear()
+        environ.update(env)
+        for target_fd, fd in enumerate(fds):
+            os.dup2(fd, target_fd)
+            os.close(fd)
+
+        exit_code = 0
+        try:
+            os.chdir(cwd)
+            CureArgParser([*args, '--no-daemon']).parse()
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else 1
+        except BaseException as e:
+            print(f'cure serve: {type(e).__name__}: {e}', file=sys.stderr)
+            exit_code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            flush_c_streams()
+            # the child leaves with os._exit, which skips the atexit handlers
+            flush_counters()
+
+        return exit_code
+
+    @staticmethod
+    def reply(conn: socket.socket, pid: int):
+        _, status = os.waitpid(pid, 0)
+        exit_code = os.waitstatus_to_exitcode(status)
+        if exit_code < 0:
+            # killed by a signal, report it like a shell would
+            exit_code = 128 - exit_code
+
+        with conn:
+            try:
+                conn.sendall(dumps({'exit_code': exit_code}).encode('utf-8') + b'\n')
+            except OSError:
+                pass
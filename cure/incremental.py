@@ -0,0 +1,216 @@
+"""Incremental front end: reparse and reanalyse only the top-level functions that changed
+between two versions of a file.
+
+The source is split into top-level `fn` items and the statements between them. Every segment
+is parsed on its own, padded with blank lines and spaces so that its positions are the same
+as in a parse of the whole file, and kept by its text. An item that only moved keeps its tree,
+with its positions shifted to the new line.
+
+An analysed function is reused when its text is unchanged and so is everything it can see,
+the signatures of the functions and the statements before it. The top-level statements
+between functions are cheap and declare variables, so they are always reanalysed."""
+from dataclasses import dataclass
+from pathlib import Path
+from copy import copy
+
+from cure.parser.pratt import Token, tokenize
+from cure.cache import CompileCache
+from cure.passes.analyser import Analyser
+from cure.trace import TRACE, trace
+from cure.timing import TIMER
+from cure import ir
+
+
+@dataclass
+class Segment:
+    text: str
+    line: int
+    column: int
+    is_function: bool
+
+    @property
+    def key(self):
+        return self.text, self.column, self.is_function
+
+def get_line_starts(src: str):
+    starts = [0]
+    for i, char in enumerate(src):
+        if char == '\n':
+            starts.append(i + 1)
+
+    return starts
+
+def segment(src: str, tokens: list[Token]):
+    """Split `src` into top-level functions and the text between them, or return None when the
+    braces do not match, the parser then reports the error"""
+    line_starts = get_line_starts(src)
+    segments = []
+    start, start_line, start_column = 0, 1, 0
+    depth = 0
+    function_start = None
+    for token in tokens:
+        offset = line_starts[token.line - 1] + token.column
+        match token.kind:
+            case 'FUNC' if depth == 0 and function_start is None:
+                segments.append(Segment(src[start:offset], start_line, start_column, False))
+                function_start = offset
+                start_line, start_column = token.line, token.column
+            case 'LBRACE':
+                depth += 1
+            case 'RBRACE':
+                depth -= 1
+                if depth < 0:
+                    return None
+
+                if depth == 0 and function_start is not None:
+                    start = offset + 1
+                    segments.append(
+                        Segment(src[function_start:start], start_line, start_column, True)
+                    )
+                    function_start = None
+                    start_line, start_column = token.line, token.column + 1
+            case 'EOF':
+                if depth != 0 or function_start is not None:
+                    return None
+
+    segments.append(Segment(src[start:], start_line, start_column, False))
+    return [segment for segment in segments if segment.text.strip()]
+
+def shift_positions(node, lines: int):
+    """Copy `node` with every position `lines` lines further down. Types come from the type map
+    and are shared, so they are left as they are"""
+    if isinstance(node, list):
+        return [shift_positions(elem, lines) for elem in node]
+
+    def shift(new_node: ir.Node):
+        new_node.pos = ir.Position.at(new_node.pos.line + lines, new_node.pos.column)
+        return new_node
+
+    return node.transform(shift)
+
+def get_interface(node: ir.Node):
+    """What later items can see of a function: its name and signature"""
+    if isinstance(node, ir.Function):
+        params = tuple((param.name, str(param.type), param.is_mutable) for param in node.params)
+        return node.name, params, str(node.type)
+
+    return None
+
+
+class IncrementalFrontEnd:
+    """Keeps the parsed and analysed top-level items of one file between `update` calls.
+
+        front_end = IncrementalFrontEnd(file)
+        scope, program = front_end.update()
+        ...
+        scope, program = front_end.update()  # after the file changed
+
+    Every update starts from a fresh fork of the prelude scope, so the returned scope is in
+    the state code generation expects."""
+
+    def __init__(self, file: Path, parser: str = 'antlr'):
+        self.file = file
+        self.parser = parser
+        # segment key -> (line, parsed nodes) and (segment key, environment) -> (line, function)
+        self.parsed: dict[tuple, tuple[int, list[ir.Node]]] = {}
+        self.analysed: dict[tuple, tuple[int, ir.Function]] = {}
+
+        self.reparsed = self.reanalysed = self.reused = 0
+        ir.Scope.keep_prelude()
+
+    def get_parser(self, scope: ir.Scope):
+        if self.parser == 'fast':
+            from cure.parser.pratt import PrattParser
+
+            return PrattParser(scope)
+
+        from cure.parser.ir_builder import CureIRBuilder
+
+        return CureIRBuilder(scope)
+
+    def parse_segment(self, scope: ir.Scope, segment: Segment):
+        if (parsed := self.parsed.get(segment.key)) is not None:
+            line, nodes = parsed
+            if line == segment.line:
+                return nodes
+
+            return shift_positions(nodes, segment.line - line)
+
+        self.reparsed += 1
+        segment_scope = copy(scope)
+        segment_scope.src = '\n' * (segment.line - 1) + ' ' * segment.column + segment.text
+        return self.get_parser(segment_scope).build().nodes
+
+    def parse(self, scope: ir.Scope):
+        tokens = tokenize(scope.src)
+        segments = segment(scope.src, tokens)
+        if segments is None:
+            # a syntax error, which a full parse reports
+            self.reparsed += 1
+            self.parsed = {}
+            return [], self.get_parser(scope).build()
+
+        parsed = {}
+        items = []
+        for seg in segments:
+            nodes = self.parse_segment(scope, seg)
+            parsed[seg.key] = (seg.line, nodes)
+            items.append((seg, nodes))
+
+        self.parsed = parsed
+        program = ir.Program(tokens[0].pos, scope.type_map.get('any'), [
+            node for _, nodes in items for node in nodes
+        ])
+        return items, program
+
+    def analyse(self, scope: ir.Scope, items: list[tuple[Segment, list[ir.Node]]]):
+        analyser = Analyser(scope)
+        analysed = {}
+        nodes = []
+        # a sha256 chained over everything the next function can see, a function is only reused
+        # when all of it is exactly the same
+        environment = ''
+        for seg, seg_nodes in items:
+            if not seg.is_function:
+                nodes.extend(analyser.visit(node) for node in seg_nodes)
+                environment = CompileCache.key(environment, seg.text)
+                continue
+
+            func = seg_nodes[0]
+            key = (seg.key, environment)
+            if (cached := self.analysed.get(key)) is not None:
+                self.reused += 1
+                line, analysed_func = cached
+                if line != seg.line:
+                    analysed_func = shift_positions(analysed_func, seg.line - line)
+
+                analyser.add_function(analysed_func)
+            else:
+                self.reanalysed += 1
+                analysed_func = analyser.visit(func)
+
+            analysed[key] = (seg.line, analysed_func)
+            nodes.append(analysed_func)
+            environment = CompileCache.key(environment, repr(get_interface(func)))
+
+        self.analysed = analysed
+        return nodes
+
+    def update(self, src: str | None = None):
+        """Parse and analyse the file again, or `src` as its new content"""
+        self.reparsed = self.reanalysed = self.reused = 0
+        scope = ir.Scope.toplevel(self.file, src)
+        items, program = self.parse(scope)
+        if not items:
+            with TIMER.phase('analyse'):
+                return scope, Analyser.run(scope, program)
+
+        with TIMER.phase('analyse'):
+            nodes = self.analyse(scope, items)
+
+        if TRACE.parse:
+            trace(
+                'parse', f'Reparsed {self.reparsed} segments, reanalysed {self.reanalysed} '\
+                    f'functions and reused {self.reused} in {self.file.as_posix()}'
+            )
+        return scope, ir.Program(program.pos, program.type, nodes)
@@ -1,44 +1,72 @@
-from typing import Union, Callable, TypeAlias, Any, cast
-from dataclasses import dataclass, field
+from typing import Union, Callable, TypeAlias, Any, ClassVar, Iterator, cast
+from dataclasses import dataclass, field, fields
 from importlib import import_module
 from sys import exit as sys_exit
-from logging import error, info
+from os import devnull
 from pathlib import Path
 from copy import copy
 from abc import ABC
 
-from colorama import Fore, Style
 from llvmlite import ir as lir
 
 from cure.codegen_utils import store_in_pointer, NULL
 from cure.target import Target
+from cure.trace import TRACE, trace
 
 
 STDLIB_PATH = Path(__file__).parent.absolute() / 'stdlib'
 BodyType: TypeAlias = Union['Body', Callable, None]
+COLUMN_BITS = 32
+COLUMN_MASK = (1 << COLUMN_BITS) - 1
 op_map = {
     '+': 'add', '-': 'sub', '*': 'mul', '/': 'div', '%': 'mod', '==': 'eq', '!=': 'neq', '>': 'gt',
     '<': 'lt', '>=': 'gte', '<=': 'lte', '&&': 'and', '||': 'or', '!': 'not_'
 }
+# node class -> names of its fields that can hold child nodes, see Node.child_fields
+_child_fields: dict[type, tuple[str, ...]] = {}
 
 
-@dataclass
-class Position:
-    line: int
-    column: int
+class Position(int):
+    """A source position packed into one int, the line above the low `COLUMN_BITS` bits and the
+    column in them. Nodes only carry the int, the line and the column are unpacked when they are
+    read, which is mostly when an error is reported"""
+
+    __slots__ = ()
+
+    @staticmethod
+    def at(line: int, column: int):
+        # packing here rather than in __new__ keeps construction in C, a Python __new__ made
+        # every position three times slower to create
+        return Position(line << COLUMN_BITS | column)
+
+    def __repr__(self):
+        return f'Position(line={self.line}, column={self.column})'
+
+    @property
+    def line(self):
+        return self >> COLUMN_BITS
+
+    @property
+    def column(self):
+        return self & COLUMN_MASK
 
     @staticmethod
     def zero():
-        return Position(0, 0)
+        return ZERO_POSITION
 
     def comptime_error(self, msg: str, src: str):
+        # colorama is only needed to report an error, so it is not imported up front
+        from colorama import Fore, Style, init
+        init()
+
         print(src.splitlines()[self.line - 1])
         print(' ' * self.column + '^')
         print(f'{Style.BRIGHT}{Fore.RED}error: {msg}{Style.RESET_ALL}')
-        error(msg)
         # raise NotImplementedError
         sys_exit(1)
 
+ZERO_POSITION = Position.at(0, 0)
+
 # TODO: I don't like this solution ;-;
 @dataclass
 class CallArgument:
@@ -109,6 +137,8 @@ class Scope:
     type_map: TypeMap = field(default_factory=TypeMap)
     dependencies: list[Path] = field(default_factory=list)
     target: Target = field(default_factory=lambda: Target.get_current())
+
+    _prelude: ClassVar[Union['Scope', None]] = None
     
     @property
     def is_toplevel(self):
@@ -124,26 +154,31 @@ class Scope:
         else:
             self.src = self.file.read_text('utf-8')
 
-            info('Adding types')
+            if TRACE.stdlib:
+                trace('stdlib', 'Adding types')
 
             free_fn = lir.FunctionType(
                 lir.IntType(8).as_pointer(),
                 [lir.IntType(8).as_pointer()]
             ).as_pointer()
 
+            # identified types live in llvmlite's global context, so they are only given a body
+            # by the first top-level scope created in the process
             Ref_type = lir.global_context.get_identified_type('Ref')
-            Ref_type.set_body(
-                lir.IntType(8).as_pointer(), # ptr
-                free_fn,
-                lir.IntType(64), # ref_count
-            )
+            if Ref_type.is_opaque:
+                Ref_type.set_body(
+                    lir.IntType(8).as_pointer(), # ptr
+                    free_fn,
+                    lir.IntType(64), # ref_count
+                )
 
             string_type = lir.global_context.get_identified_type('string')
-            string_type.set_body(
-                lir.IntType(8).as_pointer(), # ptr
-                lir.IntType(64), # length
-                Ref_type.as_pointer() # ref
-            )
+            if string_type.is_opaque:
+                string_type.set_body(
+                    lir.IntType(8).as_pointer(), # ptr
+                    lir.IntType(64), # length
+                    Ref_type.as_pointer() # ref
+                )
 
             self.type_map.add('int', lir.IntType(32))
             self.type_map.add('float', lir.FloatType())
@@ -158,10 +193,47 @@ class Scope:
 
             self.type_map.add('Math', lir.IntType(8).as_pointer())
 
-            info('Added types')
+            if TRACE.stdlib:
+                trace('stdlib', 'Added types')
 
             self.use('builtins', Position.zero())
 
+    @classmethod
+    def keep_prelude(cls):
+        """Build the types and the builtins library once and reuse them for every later
+        `Scope.toplevel` call instead of rebuilding them per file"""
+        if cls._prelude is None:
+            if TRACE.stdlib:
+                trace('stdlib', 'Building prelude scope')
+            cls._prelude = cls(Path(devnull))
+        
+        return cls._prelude
+    
+    @classmethod
+    def toplevel(cls, file: Path, src: str | None = None):
+        """Create the global scope for `file`, with `src` instead of the file's content if given"""
+        if cls._prelude is None:
+            if src is None:
+                return cls(file)
+
+            # the file need not exist when its source is given
+            scope = cls(Path(devnull))
+            scope.file, scope.src = file, src
+            return scope
+        
+        return cls._prelude.fork(file, src)
+
+    def fork(self, file: Path, src: str | None = None):
+        """Create a new top-level scope for `file` that starts with this scope's symbols and types
+        without running the builtins library again"""
+        scope = copy(self)
+        scope.file = file
+        scope.src = file.read_text('utf-8') if src is None else src
+        scope.symbol_table = self.symbol_table.clone()
+        scope.type_map = self.type_map.clone()
+        scope.dependencies = self.dependencies.copy()
+        return scope
+
     def clone(self):
         return Scope(self.file, self)
     
@@ -214,34 +286,97 @@ class Scope:
         return func(pos, self, args, module, builder)
 
 
-@dataclass
+@dataclass(slots=True)
 class Node(ABC):
     pos: Position
     type: 'Type'
     
+    @classmethod
+    def child_fields(cls):
+        """Names of the fields that can hold a child node or a list of them, worked out once per
+        class. Types are shared through the type map rather than owned by the tree, so `type`
+        is not a child field and a Type has none"""
+        names = _child_fields.get(cls)
+        if names is None:
+            names = () if issubclass(cls, Type) else tuple(
+                f.name for f in fields(cls)
+                if f.name not in ('pos', 'type') and f.type not in (str, int, float, bool) and\
+                    f.type is not FunctionFlags
+            )
+            _child_fields[cls] = names
+        
+        return names
+    
+    def iter_children(self) -> Iterator['Node']:
+        for name in self.child_fields():
+            value = getattr(self, name)
+            if isinstance(value, list):
+                for elem in value:
+                    if isinstance(elem, Node) and not isinstance(elem, Type):
+                        yield elem
+            elif isinstance(value, Node) and not isinstance(value, Type):
+                yield value
+    
     @property
     def children(self):
-        children = []
-        for attr in dir(self):
-            if attr.startswith('_') or attr == 'children':
+        return list(self.iter_children())
+    
+    def walk(self) -> Iterator['Node']:
+        """Every node of the tree in pre-order, starting with this one"""
+        stack: list[Node] = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            children = node.children
+            children.reverse()
+            stack.extend(children)
+    
+    def post_order(self) -> Iterator['Node']:
+        """Every node of the tree, each one after its children and this one last"""
+        stack: list[tuple[Node, bool]] = [(self, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if children_done:
+                yield node
                 continue
 
-            value = getattr(self, attr)
-            if isinstance(value, Node):
-                children.append(value)
-            elif isinstance(value, (list, tuple, set)):
-                for elem in children:
-                    if not isinstance(elem, Node):
-                        continue
-
-                    children.append(elem)
+            stack.append((node, True))
+            children = node.children
+            children.reverse()
+            stack.extend((child, False) for child in children)
+    
+    def map_children(self, func: Callable[['Node'], Any]):
+        """Copy this node with every child replaced by `func(child)`"""
+        new_node = copy(self)
+        for name in self.child_fields():
+            value = getattr(self, name)
+            if isinstance(value, list):
+                setattr(new_node, name, [
+                    func(elem) if isinstance(elem, Node) and not isinstance(elem, Type) else elem
+                    for elem in value
+                ])
+            elif isinstance(value, Node) and not isinstance(value, Type):
+                setattr(new_node, name, func(value))
+        
+        return new_node
+    
+    def transform(self, func: Callable[['Node'], Any]):
+        """Rebuild the tree bottom-up, every node is copied with its children transformed and
+        then replaced by what `func` returns for the copy"""
+        # id of a node -> what it was transformed into, post-order transforms every child before
+        # its parent asks for it
+        transformed: dict[int, Any] = {}
+        for node in self.post_order():
+            transformed[id(node)] = func(
+                node.map_children(lambda child: transformed[id(child)])
+            )
         
-        return children
+        return transformed[id(self)]
     
     def clone(self):
         return copy(self)
 
-@dataclass
+@dataclass(slots=True)
 class Type(Node):
     type: lir.Type
     display: str
@@ -265,109 +400,109 @@ class Type(Node):
     def as_reference(self):
         return ReferenceType(self.pos, self.type.as_pointer(), f'{self.display}&', self)
 
-@dataclass
+@dataclass(slots=True)
 class PointerType(Type):
     pointee: Type
 
     def __str__(self):
         return f'{self.pointee}*'
 
-@dataclass
+@dataclass(slots=True)
 class ReferenceType(Type):
     inner_type: Type
 
-@dataclass
+@dataclass(slots=True)
 class Program(Node):
     nodes: list[Node] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class Int(Node):
     value: int
 
-@dataclass
+@dataclass(slots=True)
 class Float(Node):
     value: float
 
-@dataclass
+@dataclass(slots=True)
 class String(Node):
     value: str
 
-@dataclass
+@dataclass(slots=True)
 class Bool(Node):
     value: bool
 
-@dataclass
+@dataclass(slots=True)
 class Nil(Node):
     ...
 
-@dataclass
+@dataclass(slots=True)
 class StringLiteral(Node):
     value: str
 
-@dataclass
+@dataclass(slots=True)
 class Id(Node):
     name: str
 
-@dataclass
+@dataclass(slots=True)
 class BinaryOp(Node):
     left: Node
     op: str
     right: Node
 
-@dataclass
+@dataclass(slots=True)
 class UnaryOp(Node):
     op: str
     expr: Node
 
-@dataclass
+@dataclass(slots=True)
 class Call(Node):
     callee: str
     args: list[Node] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class Attribute(Node):
     obj: Node
     attr: str
     args: Union[list[Node], None] = None # default to property call
 
-@dataclass
+@dataclass(slots=True)
 class Cast(Node):
     obj: Node
 
-@dataclass
+@dataclass(slots=True)
 class Ternary(Node):
     condition: Node
     true: Node
     false: Node
 
-@dataclass
+@dataclass(slots=True)
 class NewArray(Node):
     element_type: Type
     capacity: Node
 
-@dataclass
+@dataclass(slots=True)
 class Param(Node):
     name: str
     is_mutable: bool = False
 
-@dataclass
+@dataclass(slots=True)
 class Body(Node):
     nodes: list[Node] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class Variable(Node):
     name: str
     value: Union[Node, None] = None
     is_mutable: bool = False
     op: str = ''
 
-@dataclass
+@dataclass(slots=True)
 class Assignment(Node):
     name: str
     value: Node
     op: str = ''
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class FunctionFlags:
     static: bool = False
     extern: bool = False
@@ -375,7 +510,7 @@ class FunctionFlags:
     property: bool = False
     method: bool = False
 
-@dataclass
+@dataclass(slots=True)
 class Function(Node):
     name: str
     params: list[Param] = field(default_factory=list)
@@ -426,9 +561,11 @@ class Function(Node):
             
             def_scope.symbol_table.add(Symbol(param.name, ir_type, value))
         
-        params_str = ', '.join(f'{param.name} (type {param.type})' for param in params)
-        info(f'Added parameters to scope: {params_str}')
-        info(f'Compiling {callee}')
+        if TRACE.stdlib:
+            params_str = ', '.join(f'{param.name} (type {param.type})' for param in params)
+            trace('stdlib', f'Added parameters to scope: {params_str}')
+            trace('stdlib', f'Compiling {callee}')
+        
         if self.body is not None and callable(self.body):
             result = self.body(ctx)
 
@@ -438,7 +575,8 @@ class Function(Node):
         elif self.ret_type == scope.type_map.get('nil') and not body_builder.block.is_terminated:
             body_builder.ret(NULL())
 
-        info(f'Compiled {callee}')
+        if TRACE.stdlib:
+            trace('stdlib', f'Compiled {callee}')
         return ir_func
     
     @staticmethod
@@ -477,24 +615,28 @@ class Function(Node):
         else:
             # for each overload, call _check_params, if none match, produce an error
             for overload in self.overloads:
-                if not self._check_params(scope, [param.type for param in overload.params], arg_types):
+                if not self._check_params(
+                    scope, [param.type for param in overload.params], arg_types
+                ):
                     continue
 
                 func = overload
                 break
             else:
                 arg_types_str = ', '.join(map(str, arg_types))
-                error(
-                    f'no matching overloads for argument types [{arg_types_str}]'\
-                        f' for function call to {self.name}'
-                )
-
-                info(f'Args: {args}')
-                info(f'Argument types {arg_types}')
-                info(f'Parameter Types: [{", ".join(str(param.type) for param in self.params)}]')
-                info(f'Num Overloads: {len(self.overloads)}')
-                if self.overloads:
-                    info(f'Overload Names: [{", ".join(overload.name for overload in self.overloads)}]')
+                if TRACE.analyse:
+                    trace(
+                        'analyse', f'no matching overloads for argument types [{arg_types_str}]'\
+                            f' for function call to {self.name}'
+                    )
+                    trace('analyse', f'Args: {args}')
+                    trace('analyse', f'Argument types {arg_types}')
+                    param_types_str = ', '.join(str(param.type) for param in self.params)
+                    trace('analyse', f'Parameter Types: [{param_types_str}]')
+                    trace('analyse', f'Num Overloads: {len(self.overloads)}')
+                    if self.overloads:
+                        overload_names = ', '.join(overload.name for overload in self.overloads)
+                        trace('analyse', f'Overload Names: [{overload_names}]')
 
                 pos.comptime_error(
                     f'no matching overloads [{arg_types_str}]', scope.src
@@ -503,7 +645,8 @@ class Function(Node):
         # if the module and builder is given, then it's a code generation call and the .compile
         # function should be used
         if module is not None and builder is not None:
-            info(f'Code generation call to {func.name}')
+            if TRACE.codegen:
+                trace('codegen', f'Code generation call to {func.name}')
             ir_func = func.compile(pos, module, scope, arg_types)
             call_args = []
             for arg, param in zip(args, func.params):
@@ -516,30 +659,31 @@ class Function(Node):
             return builder.call(ir_func, call_args)
         # otherwise, the call is an IR call, return the Call node
         else:
-            info(f'IR call to {func.name}')
+            if TRACE.analyse:
+                trace('analyse', f'IR call to {func.name}')
             return Call(pos, func.ret_type, self.name, args)
 
-@dataclass
+@dataclass(slots=True)
 class Return(Node):
     value: Node
 
-@dataclass
+@dataclass(slots=True)
 class Comment(Node):
     text: str
 
-@dataclass
+@dataclass(slots=True)
 class Elif(Node):
     condition: Node
     body: Body
 
-@dataclass
+@dataclass(slots=True)
 class If(Node):
     condition: Node
     body: Body
     else_body: Union[Body, None] = None
     elseifs: list[Elif] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class While(Node):
     condition: Node
     body: Body
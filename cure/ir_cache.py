@@ -0,0 +1,129 @@
+"""Serialise `ir` trees into a compact binary format, so parsed and analysed programs can be
+kept in the compile cache.
+
+A node is written as a tuple of its class name, its packed position and its other fields in
+declaration order. Types are written by their display name, which is resolved
+against the scope's type map again when loading. The tuples are stored with `marshal`."""
+from dataclasses import fields
+from typing import Any
+import marshal
+
+from cure.cache import CompileCache, compiler_version
+from cure.trace import TRACE, trace
+from cure import ir
+
+
+NODE_CLASSES = {
+    cls.__name__: cls for cls in vars(ir).values()
+    if isinstance(cls, type) and issubclass(cls, ir.Node)
+}
+FLAGS = [flag.name for flag in fields(ir.FunctionFlags)]
+
+
+def encode(value) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+
+    if isinstance(value, list):
+        return [encode(elem) for elem in value]
+
+    if isinstance(value, ir.PointerType):
+        return ('PointerType', int(value.pos), value.display, encode(value.pointee))
+
+    if isinstance(value, ir.ReferenceType):
+        return ('ReferenceType', int(value.pos), value.display, encode(value.inner_type))
+
+    if isinstance(value, ir.Type):
+        return ('Type', int(value.pos), value.display)
+
+    if isinstance(value, ir.FunctionFlags):
+        return ('FunctionFlags', *(getattr(value, flag) for flag in FLAGS))
+
+    if isinstance(value, ir.Node):
+        return (
+            type(value).__name__, int(value.pos),
+            *(encode(getattr(value, f.name)) for f in fields(value)[1:])
+        )
+
+    # e.g. a builtin function whose body is Python code
+    raise ValueError(f'cannot serialise {type(value).__name__}')
+
+
+class Decoder:
+    def __init__(self, scope: ir.Scope):
+        self.scope = scope
+        self.decoders = {
+            'Type': self.decode_type, 'PointerType': self.decode_pointer_type,
+            'ReferenceType': self.decode_reference_type, 'FunctionFlags': self.decode_flags
+        }
+
+    def decode(self, value) -> Any:
+        if isinstance(value, list):
+            return [self.decode(elem) for elem in value]
+
+        if not isinstance(value, tuple):
+            return value
+
+        tag = value[0]
+        if (decoder := self.decoders.get(tag)) is not None:
+            return decoder(*value[1:])
+
+        decode = self.decode
+        return NODE_CLASSES[tag](ir.Position(value[1]), *[decode(elem) for elem in value[2:]])
+
+    def decode_type(self, pos: int, display: str):
+        type = self.scope.type_map.get(display)
+        if type is None:
+            raise ValueError(f'unknown type {display}')
+
+        # types from the type map are shared, only copy the ones written in the source
+        if type.pos != pos:
+            return ir.Type(ir.Position(pos), type.type, display)
+
+        return type
+
+    def decode_pointer_type(self, pos: int, display: str, pointee):
+        pointee = self.decode(pointee)
+        return ir.PointerType(ir.Position(pos), pointee.type.as_pointer(), display, pointee)
+
+    def decode_reference_type(self, pos: int, display: str, inner_type):
+        inner_type = self.decode(inner_type)
+        return ir.ReferenceType(
+            ir.Position(pos), inner_type.type.as_pointer(), display, inner_type
+        )
+
+    def decode_flags(self, *values: bool):
+        return ir.FunctionFlags(**dict(zip(FLAGS, values)))
+
+
+def dumps(program: ir.Program):
+    return marshal.dumps(encode(program))
+
+def loads(data: bytes, scope: ir.Scope) -> ir.Program:
+    return Decoder(scope).decode(marshal.loads(data))
+
+def get_key(stage: str, scope: ir.Scope):
+    return CompileCache.key('ir', stage, compiler_version(), scope.src)
+
+def load(cache: CompileCache, stage: str, scope: ir.Scope):
+    """Get the program at `stage` (`parsed` or `analysed`) for `scope`'s source"""
+    data = cache.get(get_key(stage, scope))
+    if data is None:
+        return None
+
+    try:
+        return loads(data, scope)
+    except (ValueError, EOFError, TypeError, KeyError) as e:
+        if TRACE.cache:
+            trace('cache', f'Ignoring the cached {stage} program: {e}')
+        return None
+
+def save(cache: CompileCache, stage: str, scope: ir.Scope, program: ir.Program):
+    try:
+        data = dumps(program)
+    except ValueError as e:
+        if TRACE.cache:
+            trace('cache', f'Not caching the {stage} program: {e}')
+        return
+
+    cache.put(get_key(stage, scope), data)
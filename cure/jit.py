@@ -0,0 +1,288 @@
+from ctypes import CFUNCTYPE, POINTER, c_int32, c_void_p, cast as c_cast
+from threading import Thread, Lock
+from traceback import print_exc
+from abc import ABC, abstractmethod
+from queue import Queue
+import os
+
+from llvmlite import ir as lir, binding as llvm
+
+from cure.backend import parse_module, optimize_module
+from cure.cache import CompileCache, compiler_version
+from cure.timing import TIMER
+from cure.trace import TRACE, trace
+
+
+RESOLVE_SYMBOL = 'cure.jit.resolve'
+HOT_SYMBOL = 'cure.jit.hot'
+ResolveFunc = CFUNCTYPE(c_void_p, c_int32)
+HotFunc = CFUNCTYPE(None, c_int32)
+
+
+def get_pointer_name(name: str):
+    return f'{name}.ptr'
+
+def get_stub_name(name: str):
+    return f'{name}.stub'
+
+def get_counter_name(name: str):
+    return f'{name}.counter'
+
+def get_impl_name(name: str):
+    return f'{name}.impl'
+
+def get_calls_name(name: str):
+    return f'{name}.calls'
+
+def call_and_return(builder: lir.IRBuilder, func: lir.Value, args, return_type: lir.Type):
+    result = builder.call(func, args, tail=True)
+    if isinstance(return_type, lir.VoidType):
+        builder.ret_void()
+    else:
+        builder.ret(result)
+
+def create_stub_module(signatures: dict[str, lir.FunctionType], triple: str):
+    """Create the module that owns the function pointer table: `<name>.ptr` initially points at
+    `<name>.stub`, which asks the JIT for the real function and then calls it"""
+    module = lir.Module('cure.stubs')
+    module.triple = triple
+
+    resolve = lir.Function(
+        module, lir.FunctionType(lir.IntType(8).as_pointer(), [lir.IntType(32)]), RESOLVE_SYMBOL
+    )
+
+    for index, (name, signature) in enumerate(signatures.items()):
+        stub = lir.Function(module, signature, get_stub_name(name))
+        builder = lir.IRBuilder(stub.append_basic_block('entry'))
+        address = builder.call(resolve, [lir.Constant(lir.IntType(32), index)])
+        func = builder.bitcast(address, signature.as_pointer())
+        call_and_return(builder, func, stub.args, signature.return_type)
+
+        ptr = lir.GlobalVariable(module, signature.as_pointer(), get_pointer_name(name))
+        ptr.initializer = stub
+
+    return module
+
+def add_call_counters(module: lir.Module, signatures: dict[str, lir.FunctionType], threshold: int):
+    """Add `<name>.counter` trampolines to a stub module. A trampoline counts the calls to
+    `<name>.impl` and reports the function as hot once the count reaches `threshold`"""
+    hot = lir.Function(module, lir.FunctionType(lir.VoidType(), [lir.IntType(32)]), HOT_SYMBOL)
+
+    for index, (name, signature) in enumerate(signatures.items()):
+        impl = lir.GlobalVariable(module, signature.as_pointer(), get_impl_name(name))
+        impl.initializer = lir.Constant(signature.as_pointer(), None)
+
+        calls = lir.GlobalVariable(module, lir.IntType(64), get_calls_name(name))
+        calls.initializer = lir.Constant(lir.IntType(64), 0)
+
+        counter = lir.Function(module, signature, get_counter_name(name))
+        builder = lir.IRBuilder(counter.append_basic_block('entry'))
+        one = lir.Constant(lir.IntType(64), 1)
+        count = builder.add(builder.atomic_rmw('add', calls, one, 'monotonic'), one)
+        is_hot = builder.icmp_unsigned('==', count, lir.Constant(lir.IntType(64), threshold))
+        with builder.if_then(is_hot, likely=False):
+            builder.call(hot, [lir.Constant(lir.IntType(32), index)])
+
+        call_and_return(builder, builder.load(impl), counter.args, signature.return_type)
+
+    return module
+
+
+class FunctionJIT(ABC):
+    """Base of the ORC engines that JIT-compile each top-level function as its own library.
+
+    All calls between functions go through the function pointer table of the stub module, so
+    the engine decides when each function is compiled and can swap its code later on."""
+
+    def __init__(
+        self, target_machine: llvm.TargetMachine, opt_level: str, modules: dict[str, lir.Module],
+        cache: CompileCache | None = None, target_key: str = ''
+    ):
+        self.target_machine = target_machine
+        self.opt_level = opt_level
+        self.modules = modules
+        self.names = list(modules.keys())
+        self.cache = cache
+        self.target_key = target_key
+
+        self.lljit = llvm.create_lljit_compiler(target_machine)
+        self.trackers: dict[str, llvm.ResourceTracker] = {}
+        self.lock = Lock()
+        self.resolve_func = ResolveFunc(self._resolve)
+
+        triple = next(iter(modules.values())).triple if modules else llvm.get_default_triple()
+        signatures = {name: module.get_global(name).ftype for name, module in modules.items()}
+
+        builder = llvm.JITLibraryBuilder()\
+            .add_ir(self.create_stub_module(signatures, triple))
+        for name, address in self.get_imports().items():
+            builder.import_symbol(name, address)
+
+        for name in self.names:
+            for symbol in self.get_exports(name):
+                builder.export_symbol(symbol)
+
+        self.stubs = builder.link(self.lljit, 'cure.stubs')
+        self.table = {name: self.stubs[get_pointer_name(name)] for name in self.names}
+
+    def create_stub_module(self, signatures: dict[str, lir.FunctionType], triple: str):
+        return create_stub_module(signatures, triple)
+
+    def get_imports(self) -> dict[str, int]:
+        return {RESOLVE_SYMBOL: c_cast(self.resolve_func, c_void_p).value or 0}
+
+    def get_exports(self, name: str):
+        return [get_pointer_name(name)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        self.trackers.clear()
+        del self.stubs
+        self.lljit.close()
+
+    def get_target_machine(self, _: str):
+        return self.target_machine
+
+    def compile_object(self, name: str, opt_level: str):
+        code = str(self.modules[name])
+        key = None
+        if self.cache is not None:
+            # keyed by the unoptimised IR, so a hit skips the optimisation passes as well
+            key = CompileCache.key(
+                'jit-function', compiler_version(), self.target_key, opt_level, code
+            )
+            if (obj := self.cache.get(key)) is not None:
+                return obj
+
+        target_machine = self.get_target_machine(opt_level)
+        module = parse_module(code)
+        optimize_module(module, target_machine, opt_level)
+        with TIMER.phase('emit'):
+            obj = target_machine.emit_object(module)
+        if self.cache is not None and key is not None:
+            self.cache.put(key, obj)
+
+        return obj
+
+    def load(self, name: str, opt_level: str, library_name: str):
+        """Compile `name` at `opt_level` into a new library and return its address"""
+        if TRACE.jit:
+            trace('jit', f'JIT compiling {name} at -O{opt_level}')
+        # the target machine and the LLJIT instance are shared with background compiles
+        with self.lock:
+            tracker = llvm.JITLibraryBuilder()\
+                .add_object_img(self.compile_object(name, opt_level))\
+                .add_jit_library('cure.stubs')\
+                .add_current_process()\
+                .export_symbol(name)\
+                .link(self.lljit, library_name)
+
+        self.trackers[library_name] = tracker
+        return tracker[name]
+
+    def set_address(self, name: str, address: int, symbol: str | None = None):
+        table_address = self.table[name] if symbol is None else self.stubs[symbol]
+        c_cast(table_address, POINTER(c_void_p))[0] = address
+
+    def get_address(self, name: str) -> int:
+        return c_cast(self.table[name], POINTER(c_void_p))[0] or 0
+
+    def _resolve(self, index: int):
+        # runs inside JIT-compiled code, an exception here can not be propagated through it
+        try:
+            return self.resolve(self.names[index])
+        except BaseException:
+            print_exc()
+            os._exit(1)
+
+    @abstractmethod
+    def resolve(self, name: str) -> int:
+        ...
+
+
+class LazyJIT(FunctionJIT):
+    """Compiles each function the first time it is called, functions that are never called are
+    never compiled"""
+
+    def resolve(self, name: str):
+        if (library_name := f'cure.{name}') in self.trackers:
+            return self.get_address(name)
+
+        address = self.load(name, self.opt_level, library_name)
+        self.set_address(name, address)
+        return address
+
+
+class TieredJIT(FunctionJIT):
+    """Compiles each function at `opt_level` (normally -O0) on its first call and counts its
+    calls. Once a function has been called `threshold` times it is recompiled at `hot_opt_level`
+    on a background thread, and its function pointer table entry is switched to the new code.
+
+    There is no on-stack replacement: a function only runs optimised code from its next call on,
+    so a long loop in `main` stays at the first tier while the functions it calls tier up."""
+
+    def __init__(
+        self, target_machine: llvm.TargetMachine, opt_level: str, modules: dict[str, lir.Module],
+        cache: CompileCache | None = None, target_key: str = '', threshold: int = 1000,
+        hot_opt_level: str = '3', hot_target_machine: llvm.TargetMachine | None = None
+    ):
+        self.threshold = threshold
+        self.hot_opt_level = hot_opt_level
+        self.hot_target_machine = hot_target_machine or target_machine
+        self.hot_func = HotFunc(self._hot)
+        self.queue: Queue[str | None] = Queue()
+        self.worker = Thread(target=self._work, name='cure-tier-up', daemon=True)
+
+        super().__init__(target_machine, opt_level, modules, cache, target_key)
+        self.worker.start()
+
+    def close(self):
+        self.queue.put(None)
+        self.worker.join()
+        super().close()
+
+    def get_target_machine(self, opt_level: str):
+        if opt_level == self.hot_opt_level:
+            return self.hot_target_machine
+
+        return self.target_machine
+
+    def create_stub_module(self, signatures: dict[str, lir.FunctionType], triple: str):
+        module = create_stub_module(signatures, triple)
+        return add_call_counters(module, signatures, self.threshold)
+
+    def get_imports(self):
+        return {**super().get_imports(), HOT_SYMBOL: c_cast(self.hot_func, c_void_p).value or 0}
+
+    def get_exports(self, name: str):
+        return [*super().get_exports(name), get_impl_name(name), get_counter_name(name)]
+
+    def resolve(self, name: str):
+        if (library_name := f'cure.{name}') in self.trackers:
+            return self.get_address(name)
+
+        address = self.load(name, self.opt_level, library_name)
+        self.set_address(name, address, get_impl_name(name))
+        self.set_address(name, self.stubs[get_counter_name(name)])
+        return address
+
+    def _hot(self, index: int):
+        self.queue.put(self.names[index])
+
+    def _work(self):
+        while (name := self.queue.get()) is not None:
+            try:
+                address = self.load(name, self.hot_opt_level, f'cure.{name}.hot')
+            except BaseException:
+                print_exc()
+                continue
+
+            # callers load the table entry on every call, so this is the whole tier-up
+            self.set_address(name, address)
+            if TRACE.jit:
+                trace('jit', f'Tiered up {name}')
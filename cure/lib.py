@@ -1,13 +1,13 @@
 from typing import Callable, Any, cast, Union
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from logging import info, debug
 
 from llvmlite import ir as lir
 
 from cure.codegen_utils import create_string_constant
 from cure.c_registry import CRegistry
 from cure import ir
+from cure.trace import TRACE, trace
 
 
 def get_method_name(self, name: str):
@@ -49,7 +49,8 @@ def function(self: Any, params: list[ir.Param] | None = None, ret_type: ir.Type
                 )
             ))
 
-            info(f'Registered function {name}')
+            if TRACE.stdlib:
+                trace('stdlib', f'Registered function {name}')
         
         return func
     
@@ -81,7 +82,8 @@ def overload(overload_of: Callable, params: list[ir.Param] | None = None,
                 ir.Position.zero(), ret_type, name, params, func, func.flags
             ))
 
-            info(f'Registered overload {name} (overload of {overload_of.name})')
+            if TRACE.stdlib:
+                trace('stdlib', f'Registered overload {name} (overload of {overload_of.name})')
         
         return func
     
@@ -100,7 +102,8 @@ def getattrs(instance):
 
 def add_instance(self, instance):
     attrs = [attr.__name__ for attr in getattrs(instance).values()]
-    debug(f'Adding {attrs} (from instance {instance}) to {self}')
+    if TRACE.stdlib:
+        trace('stdlib', f'Adding {attrs} (from instance {instance}) to {self}')
 
     for v in getattrs(instance).values():
         if (overload_of := getattr(v, 'overload_of', None)) is not None:
@@ -108,7 +111,8 @@ def add_instance(self, instance):
         else:
             function(self, v.params, v.ret_type, v.flags, v.name)(v)
 
-        info(f'Added {v.name} from {self._name}')
+        if TRACE.stdlib:
+            trace('stdlib', f'Added {v.name} from {self._name}')
 
 
 @dataclass
@@ -187,7 +191,8 @@ class Lib(ABC):
     def add(self, cls: type[Union['Lib', 'Class']]):
         instance = cls(self.scope)
         add_instance(self, instance)
-        info(f'merged {self._name} and {instance._name} (Lib)')
+        if TRACE.stdlib:
+            trace('stdlib', f'merged {self._name} and {instance._name} (Lib)')
 
 @dataclass
 class LibType:
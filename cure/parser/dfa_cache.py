@@ -0,0 +1,114 @@
+"""Persist the prediction DFAs the ANTLR runtime builds while parsing, so a new process starts
+with a warm parser instead of rebuilding them from the ATN on every run.
+
+Only the DFAs are pickled, ATN states and the runtime's singletons (`SemanticContext.NONE`,
+`PredictionContext.EMPTY`, the error state and the lexer actions) are written as references
+and resolved against this process's `CureParser.atn`/`CureLexer.atn` when loading, since the
+runtime compares them by identity."""
+from pickle import Pickler, Unpickler, UnpicklingError, HIGHEST_PROTOCOL
+from importlib.metadata import version
+from io import BytesIO
+import sys
+
+from antlr4.PredictionContext import PredictionContext
+from antlr4.atn.SemanticContext import SemanticContext
+from antlr4.atn.ATNSimulator import ATNSimulator
+
+from cure.parser import CureParser as parser_module, CureLexer as lexer_module
+from cure.cache import CompileCache
+from cure.trace import TRACE, trace
+
+
+CureParser, CureLexer = parser_module.CureParser, lexer_module.CureLexer
+
+_loaded_states: int | None = None
+
+
+def get_key():
+    """The DFAs are only valid for the ATNs they were built from and the runtime that built them"""
+    python_version = f'{sys.version_info.major}.{sys.version_info.minor}'
+    return CompileCache.key(
+        'antlr-dfa', version('antlr4-python3-runtime'), python_version,
+        str(parser_module.serializedATN()), str(lexer_module.serializedATN())
+    )
+
+def get_references():
+    references: dict[str, object] = {
+        'none': SemanticContext.NONE, 'empty': PredictionContext.EMPTY, 'error': ATNSimulator.ERROR
+    }
+    for name, atn in (('parser', CureParser.atn), ('lexer', CureLexer.atn)):
+        for state in atn.states:
+            if state is not None:
+                references[f'{name}:{state.stateNumber}'] = state
+
+    for i, action in enumerate(CureLexer.atn.lexerActions or []):
+        references[f'action:{i}'] = action
+
+    return references
+
+def count_states():
+    return sum(len(dfa._states) for dfa in CureParser.decisionsToDFA + CureLexer.decisionsToDFA)
+
+
+class DFAPickler(Pickler):
+    def __init__(self, file, references: dict[str, object]):
+        super().__init__(file, HIGHEST_PROTOCOL)
+        self.ids = {id(obj): name for name, obj in references.items()}
+
+    def persistent_id(self, obj):
+        return self.ids.get(id(obj))
+
+class DFAUnpickler(Unpickler):
+    def __init__(self, file, references: dict[str, object]):
+        super().__init__(file)
+        self.references = references
+
+    def persistent_load(self, pid):
+        if (obj := self.references.get(pid)) is None:
+            raise UnpicklingError(f'unknown reference {pid}')
+
+        return obj
+
+
+def load(cache: CompileCache):
+    """Replace the parser's and lexer's DFAs with the cached ones, once per process"""
+    global _loaded_states
+    if _loaded_states is not None:
+        return
+
+    _loaded_states = count_states()
+    data = cache.get(get_key())
+    if data is None:
+        return
+
+    try:
+        parser_dfas, lexer_dfas = DFAUnpickler(BytesIO(data), get_references()).load()
+    except (UnpicklingError, EOFError, AttributeError, ValueError) as e:
+        if TRACE.parse:
+            trace('parse', f'Ignoring the cached parser DFA: {e}')
+        return
+
+    for dfa in parser_dfas + lexer_dfas:
+        # pickle fills in dict keys before their objects, so hash the states again
+        dfa._states = {state: state for state in dfa._states}
+
+    # in place, parsers that already exist share these lists
+    CureParser.decisionsToDFA[:] = parser_dfas
+    CureLexer.decisionsToDFA[:] = lexer_dfas
+    _loaded_states = count_states()
+    if TRACE.parse:
+        trace('parse', f'Loaded {_loaded_states} parser DFA states')
+
+def save(cache: CompileCache):
+    """Write the DFAs back if parsing added states to them"""
+    global _loaded_states
+    states = count_states()
+    if _loaded_states is not None and states <= _loaded_states:
+        return
+
+    file = BytesIO()
+    DFAPickler(file, get_references()).dump((CureParser.decisionsToDFA, CureLexer.decisionsToDFA))
+    cache.put(get_key(), file.getvalue())
+    _loaded_states = states
+    if TRACE.parse:
+        trace('parse', f'Saved {states} parser DFA states')
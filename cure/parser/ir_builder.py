@@ -1,18 +1,23 @@
 from antlr4 import InputStream, CommonTokenStream, RuleContext
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
+from antlr4.atn.PredictionMode import PredictionMode
 from antlr4.error.ErrorListener import ErrorListener
 from antlr4.Token import Token
 
 from cure.parser.CureVisitor import CureVisitor
 from cure.parser.CureParser import CureParser
 from cure.parser.CureLexer import CureLexer
+from cure.trace import TRACE, trace
+from cure.timing import TIMER
 from cure import ir
 
 
 def to_pos(ctx):
     if isinstance(ctx, Token):
-        return ir.Position(ctx.line, ctx.column)
+        return ir.Position.at(ctx.line, ctx.column)
     elif isinstance(ctx, RuleContext):
-        return ir.Position(ctx.start.line, ctx.start.column)
+        return ir.Position.at(ctx.start.line, ctx.start.column)
     
     raise NotImplementedError
 
@@ -22,7 +27,7 @@ class CureErrorListener(ErrorListener):
         self.src = src
 
     def syntaxError(self, _, offendingSymbol: Token, line, column, _msg, _e):
-        pos = ir.Position(line, column)
+        pos = ir.Position.at(line, column)
         pos.comptime_error(f'invalid syntax \'{offendingSymbol.text}\'', self.src)
 
 
@@ -32,11 +37,33 @@ class CureIRBuilder(CureVisitor):
         self.scope = scope
 
     def build(self):
-        lexer = CureLexer(InputStream(self.src))
-        parser = CureParser(CommonTokenStream(lexer))
+        with TIMER.phase('lex'):
+            tokens = CommonTokenStream(CureLexer(InputStream(self.src)))
+            tokens.fill()
+
+        with TIMER.phase('parse'):
+            return self.visit(self.parse(tokens))
+
+    def parse(self, tokens: CommonTokenStream):
+        """Parse in SLL mode first, which is much faster than full LL but gives up on input that
+        needs the full context to decide. Only then, or on a syntax error, parse again in LL mode,
+        which also reports the syntax error"""
+        parser = CureParser(tokens)
         parser.removeErrorListeners()
+        parser._interp.predictionMode = PredictionMode.SLL
+        parser._errHandler = BailErrorStrategy()
+        try:
+            return parser.parse()
+        except ParseCancellationException:
+            if TRACE.parse:
+                trace('parse', f'SLL parse of {self.scope.file.as_posix()} failed, retrying with LL')
+
+        tokens.seek(0)
+        parser.reset()
         parser.addErrorListener(CureErrorListener(self.src))
-        return self.visit(parser.parse())
+        parser._interp.predictionMode = PredictionMode.LL
+        parser._errHandler = DefaultErrorStrategy()
+        return parser.parse()
 
 
     def visitOperation(self, ctx):
@@ -0,0 +1,421 @@
+"""Hand-written lexer and Pratt parser for Cure.g4 that builds `cure.ir` nodes directly.
+
+It accepts the same language as the generated ANTLR parser and produces the same tree as
+`CureIRBuilder`, including ANTLR's precedences (see the `precpred` numbers in `CureParser.expr`):
+
+    call 8, attribute 7, ternary 6, * / % 5, + - 4, comparisons 3, && || 2
+
+A binary operator with precedence `p` parses its right operand at `p + 1`, a cast parses its
+operand at 10 and a unary operator at 1, so `-a + b` is `-(a + b)` just like with ANTLR."""
+from re import compile as re_compile
+
+from cure.timing import TIMER
+from cure import ir
+
+
+KEYWORDS = {
+    'if': 'IF', 'new': 'NEW', 'fn': 'FUNC', 'else': 'ELSE', 'mut': 'MUTABLE', 'return': 'RETURN',
+    'while': 'WHILE', 'break': 'BREAK', 'continue': 'CONTINUE', 'true': 'BOOL', 'false': 'BOOL',
+    'nil': 'NIL'
+}
+
+# ANTLR lexers take the longest match, and the first rule on a tie. Alternatives that are a
+# prefix of another alternative come after it, so the first regex match is the longest one
+TOKEN_PATTERNS = [
+    ('SKIP', r'//[^\n]*\n|/\*[\s\S]*?\*/|[\t\r\n ]+'),
+    ('FLOAT', r'-?[0-9]*\.[0-9]+'),
+    ('INT', r'-?[0-9]+'),
+    ('STRING', r'"[\s\S]*?"|\'[\s\S]*?\''),
+    ('ID', r'[a-zA-Z_][a-zA-Z_0-9]*'),
+    ('OP', r'==|!=|>=|<=|&&|\|\||<-|->|[-+*/%><!.,=(){}\[\]&\']'),
+    ('OTHER', r'[\s\S]'),
+]
+TOKEN_REGEX = re_compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in TOKEN_PATTERNS))
+
+OPERATORS = {
+    '+': 'ADD', '-': 'SUB', '*': 'MUL', '/': 'DIV', '%': 'MOD', '==': 'EEQ', '!=': 'NEQ',
+    '>': 'GT', '<': 'LT', '>=': 'GTE', '<=': 'LTE', '&&': 'AND', '||': 'OR', '!': 'NOT',
+    '.': 'DOT', ',': 'COMMA', '=': 'ASSIGN', '(': 'LPAREN', ')': 'RPAREN', '{': 'LBRACE',
+    '}': 'RBRACE', '[': 'LBRACK', ']': 'RBRACK', '<-': 'RARROW', '->': 'RETURNS',
+    '&': 'AMPERSAND', '\'': 'APOSTROPHE'
+}
+
+BINARY_PRECEDENCE = {
+    'MUL': 5, 'DIV': 5, 'MOD': 5,
+    'ADD': 4, 'SUB': 4,
+    'EEQ': 3, 'NEQ': 3, 'GT': 3, 'LT': 3, 'GTE': 3, 'LTE': 3,
+    'AND': 2, 'OR': 2
+}
+CALL_PRECEDENCE = 8
+ATTRIBUTE_PRECEDENCE = 7
+TERNARY_PRECEDENCE = 6
+CAST_OPERAND_PRECEDENCE = 10
+UNARY_OPERAND_PRECEDENCE = 1
+
+ATOMS = {'INT', 'FLOAT', 'STRING', 'BOOL', 'NIL', 'ID'}
+UNARY_OPERATORS = {'NOT', 'SUB', 'ADD'}
+EXPR_START = ATOMS | UNARY_OPERATORS | {'LPAREN'}
+ASSIGN_OPERATORS = {'ADD', 'SUB', 'MUL', 'DIV', 'MOD'}
+
+
+class Token:
+    __slots__ = ('kind', 'text', 'line', 'column')
+
+    def __init__(self, kind: str, text: str, line: int, column: int):
+        self.kind = kind
+        self.text = text
+        self.line = line
+        self.column = column
+
+    @property
+    def pos(self):
+        return ir.Position.at(self.line, self.column)
+
+
+class ParseError(Exception):
+    def __init__(self, token: Token):
+        super().__init__(f'invalid syntax \'{token.text}\'')
+        self.token = token
+
+
+def tokenize(src: str):
+    tokens: list[Token] = []
+    append = tokens.append
+    match = TOKEN_REGEX.match
+    line, line_start, i, end = 1, 0, 0, len(src)
+    while i < end:
+        m = match(src, i)
+        assert m is not None, 'OTHER matches any character'
+        kind, text = m.lastgroup or 'OTHER', m.group()
+        if kind == 'ID':
+            append(Token(KEYWORDS.get(text, 'ID'), text, line, i - line_start))
+        elif kind == 'OP':
+            append(Token(OPERATORS[text], text, line, i - line_start))
+        elif kind != 'SKIP':
+            append(Token(kind, text, line, i - line_start))
+
+        if (newlines := text.count('\n')) > 0:
+            line += newlines
+            line_start = i + text.rindex('\n') + 1
+
+        i = m.end()
+
+    append(Token('EOF', '<EOF>', line, i - line_start))
+    return tokens
+
+
+class PrattParser:
+    """Drop-in replacement for `CureIRBuilder`: `PrattParser(scope).build()` returns the same
+    `ir.Program`. Syntax errors are reported at the first token that cannot be parsed."""
+
+    def __init__(self, scope: ir.Scope):
+        self.src = scope.src
+        self.scope = scope
+        self.tokens: list[Token] = []
+        self.i = 0
+
+        type_map = scope.type_map
+        self.any_type = type_map.get('any')
+        self.int_type = type_map.get('int')
+        self.float_type = type_map.get('float')
+        self.string_type = type_map.get('string')
+        self.bool_type = type_map.get('bool')
+        self.nil_type = type_map.get('nil')
+
+    def build(self):
+        with TIMER.phase('lex'):
+            self.tokens = tokenize(self.src)
+            self.i = 0
+
+        with TIMER.phase('parse'):
+            try:
+                return self.parse()
+            except ParseError as e:
+                e.token.pos.comptime_error(str(e), self.src)
+
+    def peek(self, offset: int = 0):
+        return self.tokens[min(self.i + offset, len(self.tokens) - 1)]
+
+    def next(self):
+        token = self.tokens[self.i]
+        if token.kind != 'EOF':
+            self.i += 1
+
+        return token
+
+    def expect(self, kind: str):
+        token = self.tokens[self.i]
+        if token.kind != kind:
+            raise ParseError(token)
+
+        self.i += 1
+        return token
+
+    def parse(self):
+        pos = self.peek().pos
+        nodes = []
+        while self.peek().kind != 'EOF':
+            nodes.append(self.stmt())
+
+        return ir.Program(pos, self.any_type, nodes)
+
+    def stmt(self) -> ir.Node:
+        token = self.peek()
+        match token.kind:
+            case 'FUNC':
+                return self.func_assign()
+            case 'WHILE':
+                return self.while_stmt()
+            case 'IF':
+                return self.if_stmt()
+            case 'MUTABLE':
+                return self.var_assign()
+            case 'ID':
+                following = self.peek(1).kind
+                if following == 'ASSIGN' or (
+                    following in ASSIGN_OPERATORS and self.peek(2).kind == 'ASSIGN'
+                ):
+                    return self.var_assign()
+
+        return self.expr()
+
+    def body_stmt(self):
+        token = self.peek()
+        match token.kind:
+            case 'RETURN':
+                self.next()
+                value = self.expr()
+                return ir.Return(token.pos, value.type, value)
+            case 'CONTINUE' | 'BREAK':
+                # the grammar has them but the compiler does not support them yet
+                raise NotImplementedError
+
+        return self.stmt()
+
+    def body(self):
+        pos = self.expect('LBRACE').pos
+        nodes = []
+        while self.peek().kind != 'RBRACE':
+            if self.peek().kind == 'EOF':
+                raise ParseError(self.peek())
+
+            nodes.append(self.body_stmt())
+
+        self.next()
+        return ir.Body(pos, self.any_type, nodes)
+
+    def if_stmt(self):
+        pos = self.expect('IF').pos
+        condition = self.expr()
+        body = self.body()
+
+        elseifs, else_body = [], None
+        while self.peek().kind == 'ELSE':
+            else_token = self.next()
+            if self.peek().kind == 'IF':
+                self.next()
+                elseif_condition = self.expr()
+                elseifs.append(
+                    ir.Elif(else_token.pos, self.any_type, elseif_condition, self.body())
+                )
+            else:
+                else_body = self.body()
+                break
+
+        return ir.If(pos, self.any_type, condition, body, else_body, elseifs)
+
+    def while_stmt(self):
+        pos = self.expect('WHILE').pos
+        condition = self.expr()
+        return ir.While(pos, self.any_type, condition, self.body())
+
+    def func_assign(self):
+        pos = self.expect('FUNC').pos
+        name = self.expect('ID').text
+        self.expect('LPAREN')
+        params = self.params() if self.peek().kind != 'RPAREN' else []
+        self.expect('RPAREN')
+
+        ret_type = self.nil_type
+        if self.peek().kind == 'RETURNS':
+            self.next()
+            ret_type = self.type()
+
+        return ir.Function(pos, ret_type, name, params, self.body())
+
+    def var_assign(self):
+        token = self.next()
+        is_mutable = token.kind == 'MUTABLE'
+        name = self.expect('ID').text if is_mutable else token.text
+
+        op = None
+        if not is_mutable and self.peek().kind in ASSIGN_OPERATORS:
+            op = self.next().text
+
+        self.expect('ASSIGN')
+        return ir.Variable(token.pos, self.any_type, name, self.expr(), is_mutable, op)
+
+    def params(self):
+        params = [self.param()]
+        while self.peek().kind == 'COMMA':
+            self.next()
+            params.append(self.param())
+
+        return params
+
+    def param(self):
+        pos = self.peek().pos
+        is_mutable = False
+        if self.peek().kind == 'MUTABLE':
+            self.next()
+            is_mutable = True
+
+        type = self.type()
+        return ir.Param(pos, type, self.expect('ID').text, is_mutable)
+
+    def type(self):
+        type = self.scope.type_map.get(self.expect('ID').text)
+        while self.peek().kind == 'AMPERSAND':
+            self.next()
+            type = type.as_reference()
+
+        return type
+
+    def args(self):
+        """Parse `(args?)`, the opening parenthesis is the current token"""
+        self.expect('LPAREN')
+        args = []
+        if self.peek().kind != 'RPAREN':
+            args.append(self.expr())
+            while self.peek().kind == 'COMMA':
+                self.next()
+                args.append(self.expr())
+
+        self.expect('RPAREN')
+        return args
+
+    def is_cast(self):
+        """`(ID &*)` followed by the start of an expression is a cast, `(ID)` followed by
+        anything else is a parenthesised name"""
+        i = self.i + 1
+        tokens = self.tokens
+        if tokens[i].kind != 'ID':
+            return False
+
+        i += 1
+        while tokens[i].kind == 'AMPERSAND':
+            i += 1
+
+        return tokens[i].kind == 'RPAREN' and tokens[i + 1].kind in EXPR_START
+
+    def is_reference_cast(self):
+        """`(ID &+)` can only be a cast, never a call's argument list"""
+        tokens = self.tokens
+        i = self.i + 1
+        if tokens[i].kind != 'ID' or tokens[i + 1].kind != 'AMPERSAND':
+            return False
+
+        i += 2
+        while tokens[i].kind == 'AMPERSAND':
+            i += 1
+
+        return tokens[i].kind == 'RPAREN'
+
+    def speculate(self, parse):
+        """Run `parse`, on a syntax error rewind and return None. ANTLR picks an alternative
+        with unlimited lookahead, this is how the places that need more than one token do it"""
+        start = self.i
+        try:
+            return parse()
+        except ParseError:
+            self.i = start
+            return None
+
+    def expr(self, precedence: int = 0) -> ir.Node:
+        token = self.peek()
+        kind = token.kind
+        # like an ANTLR rule context, every node starts at the first token of its expression,
+        # `(a - b) / c` starts at the `(` and not at `a`
+        start = token.pos
+        left = self.speculate(self.cast) if kind == 'LPAREN' and self.is_cast() else None
+        if left is not None:
+            # `(type) expr`
+            pass
+        elif kind in UNARY_OPERATORS:
+            self.next()
+            operand = self.expr(UNARY_OPERAND_PRECEDENCE)
+            left = ir.UnaryOp(token.pos, self.any_type, token.text, operand)
+        else:
+            left = self.atom()
+
+        while True:
+            token = self.peek()
+            kind = token.kind
+            if kind in BINARY_PRECEDENCE:
+                op_precedence = BINARY_PRECEDENCE[kind]
+                if op_precedence < precedence:
+                    break
+
+                self.next()
+                right = self.expr(op_precedence + 1)
+                left = ir.BinaryOp(start, self.any_type, left, token.text, right)
+            elif kind == 'LPAREN' and CALL_PRECEDENCE >= precedence:
+                if self.is_reference_cast():
+                    break
+
+                if not isinstance(left, ir.Id):
+                    start.comptime_error('invalid callee', self.src)
+
+                left = ir.Call(start, self.any_type, left.name, self.args())
+            elif kind == 'DOT' and ATTRIBUTE_PRECEDENCE >= precedence:
+                self.next()
+                attr = self.expect('ID').text
+                args = self.args() if self.peek().kind == 'LPAREN' else None
+                left = ir.Attribute(start, self.any_type, left, attr, args)
+            elif kind == 'IF' and TERNARY_PRECEDENCE >= precedence:
+                # `a if b else c`, or `a` followed by an if statement
+                ternary = self.speculate(lambda: self.ternary(start, left))
+                if ternary is None:
+                    break
+
+                left = ternary
+            else:
+                break
+
+        return left
+
+    def cast(self):
+        pos = self.expect('LPAREN').pos
+        type = self.type()
+        self.expect('RPAREN')
+        return ir.Cast(pos, type, self.expr(CAST_OPERAND_PRECEDENCE))
+
+    def ternary(self, start: ir.Position, true: ir.Node):
+        self.expect('IF')
+        condition = self.expr()
+        self.expect('ELSE')
+        false = self.expr(TERNARY_PRECEDENCE + 1)
+        return ir.Ternary(start, self.any_type, condition, true, false)
+
+    def atom(self) -> ir.Node:
+        token = self.next()
+        pos = token.pos
+        match token.kind:
+            case 'INT':
+                return ir.Int(pos, self.int_type, int(token.text))
+            case 'FLOAT':
+                return ir.Float(pos, self.float_type, float(token.text))
+            case 'STRING':
+                return ir.String(pos, self.string_type, token.text[1:-1])
+            case 'BOOL':
+                return ir.Bool(pos, self.bool_type, token.text == 'true')
+            case 'NIL':
+                return ir.Nil(pos, self.nil_type)
+            case 'ID':
+                return ir.Id(pos, self.any_type, token.text)
+            case 'LPAREN':
+                value = self.expr()
+                self.expect('RPAREN')
+                return value
+
+        raise ParseError(token)
@@ -1,29 +1,49 @@
-from copy import copy
+from typing import Any, Callable, ClassVar
 from abc import ABC
 
 from cure.ir import Node, Program, Scope
+from cure import ir
+
+
+NODE_CLASSES = [cls for cls in vars(ir).values() if isinstance(cls, type) and issubclass(cls, Node)]
 
 
 class CompilerPass(ABC):
+    # node class -> visit method, built once per pass class so that visiting a node is one
+    # dict lookup instead of formatting the method's name and looking it up on the instance
+    dispatch: ClassVar[dict[type, Callable[[Any, Node], Any]]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.dispatch = {}
+        for node_class in NODE_CLASSES:
+            if (method := getattr(cls, f'visit_{node_class.__name__}', None)) is not None:
+                cls.dispatch[node_class] = method
+
     def __init__(self, scope: Scope):
         self.scope = scope
-    
+
     @classmethod
     def run(cls, scope: Scope, program: Program):
         self = cls(scope)
         return self.visit(program)
-    
-    def visit(self, node: Node):
-        method_name = f'visit_{type(node).__name__}'
-        if hasattr(self, method_name):
-            method = getattr(self, method_name)
-            return method(node)
-        else:
+
+    @classmethod
+    def get_visit_method(cls, node_class: type):
+        method_name = f'visit_{node_class.__name__}'
+        method = getattr(cls, method_name, None)
+        if method is None:
             raise AttributeError(f'No method {method_name}')
 
+        cls.dispatch[node_class] = method
+        return method
+
+    def visit(self, node: Node):
+        method = self.dispatch.get(type(node))
+        if method is None:
+            method = self.get_visit_method(type(node))
+
+        return method(self, node)
+
     def visit_children(self, node: Node):
-        new_node = copy(node)
-        for child in new_node.children:
-            child = self.visit(child)
-        
-        return new_node
+        return node.map_children(self.visit)
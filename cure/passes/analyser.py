@@ -1,9 +1,9 @@
-from logging import info
 from typing import cast
 
 from cure.codegen_utils import max_value, min_value
 from cure.passes import CompilerPass
 from cure import ir
+from cure.trace import TRACE, trace
 
 
 INT_MAX = max_value(32)
@@ -14,7 +14,8 @@ class Analyser(CompilerPass):
     def visit_Program(self, node: ir.Program):
         nodes = []
         for n in node.nodes:
-            info(f'Analysing {n.__class__.__name__}')
+            if TRACE.analyse:
+                trace('analyse', f'Analysing {n.__class__.__name__}')
             nodes.append(self.visit(n))
         
         return ir.Program(node.pos, node.type, nodes)
@@ -34,13 +35,16 @@ class Analyser(CompilerPass):
     def visit_Body(self, node: ir.Body):
         self.scope = self.scope.clone()
 
-        info('Entered child scope for body')
+        if TRACE.analyse:
+            trace('analyse', 'Entered child scope for body')
         nodes = []
         for n in node.nodes:
-            info(f'Analysing body node {n.__class__.__name__}')
+            if TRACE.analyse:
+                trace('analyse', f'Analysing body node {n.__class__.__name__}')
             nodes.append(self.visit(n))
 
-        info('Exiting body')
+        if TRACE.analyse:
+            trace('analyse', 'Exiting body')
         self.scope = cast(ir.Scope, self.scope.parent)
         return ir.Body(node.pos, node.type, nodes)
     
@@ -72,23 +76,28 @@ class Analyser(CompilerPass):
         params = [self.visit(param) for param in node.params]
         type = self.visit(node.type)
         func = ir.Function(node.pos, type, node.name, params, node.body, node.flags, node.overloads)
-        self.scope.symbol_table.add(ir.Symbol(
-            node.name, cast(ir.Type, self.scope.type_map.get('function')), func
-        ))
+        self.add_function(func)
 
-        info('Adding parameters to environment')
+        if TRACE.analyse:
+            trace('analyse', 'Adding parameters to environment')
         for param in params:
             self.scope.symbol_table.add(ir.Symbol(param.name, param.type, param, param.is_mutable))
         
         body = self.visit(node.body) if isinstance(node.body, ir.Body) else node.body
 
-        info('Removing parameters from environment')
+        if TRACE.analyse:
+            trace('analyse', 'Removing parameters from environment')
         for param in params:
             self.scope.symbol_table.remove(param.name)
 
         func.body = body
         return func
     
+    def add_function(self, func: ir.Function):
+        self.scope.symbol_table.add(ir.Symbol(
+            func.name, cast(ir.Type, self.scope.type_map.get('function')), func
+        ))
+    
     def visit_Variable(self, node: ir.Variable):
         value = self.visit(node.value) if node.value is not None else node.value
         if (symbol := self.scope.symbol_table.get(node.name)) is not None and value is not None:
@@ -1,50 +1,81 @@
-from logging import info, warning
 from typing import cast
 
 from llvmlite import ir as lir, binding as llvm
 
 from cure.c_registry import CRegistry
+from cure.backend import init_llvm
 from cure.passes import CompilerPass
 from cure import ir
 from cure.codegen_utils import (
     NULL, create_while_loop, store_in_pointer, create_string_constant, get_struct_ptr_field,
     get_struct_value_field, index_of_type, create_ternary
 )
+from cure.trace import TRACE, trace
 
 
 DONT_MANAGE_MEMORY = (
     ir.Type, ir.Param, ir.Function, ir.Variable, ir.Id, ir.Body, ir.Assignment, ir.Elif,
     ir.If, ir.While, ir.Return
 )
+# node class -> whether the values of its nodes can need reference counting, i.e. it is not
+# one of DONT_MANAGE_MEMORY
+MANAGES_MEMORY: dict[type, bool] = {}
 
 
 class CodeGeneration(CompilerPass):
-    def __init__(self, scope):
+    def __init__(self, scope, split_functions: bool = False):
         super().__init__(scope)
 
-        info('Initialising LLVM')
+        init_llvm()
 
-        llvm.initialize()
-        llvm.initialize_native_target()
-        llvm.initialize_native_asmprinter()
-
-        self.module = lir.Module('main')
-        self.module.triple = llvm.get_default_triple()
+        self.split_functions = split_functions
+        self.function_modules: dict[str, lir.Module] = {}
+        # id of an LLVM type -> (the type, whether it needs memory management), the type is kept
+        # so that its id cannot be reused
+        self.memory_managed_types: dict[int, tuple[lir.Type, bool]] = {}
 
+        self.module = self._create_module('main')
         self.builder = lir.IRBuilder()
 
-        info('Created module and builder')
-        info(f'Target = {self.module.triple}')
-
-        self.c_registry = CRegistry(self.module, scope)
+        if TRACE.codegen:
+            trace('codegen', 'Created module and builder')
+            trace('codegen', f'Target = {self.module.triple}')
+    
+    @classmethod
+    def run_split(cls, scope: ir.Scope, program: ir.Program):
+        """Generate every top-level function into a module of its own. Calls between them load
+        the callee from a `<name>.ptr` function pointer global, which the JIT defines"""
+        self = cls(scope, split_functions=True)
+        self.visit(program)
+        return self.function_modules
+    
+    def _create_module(self, name: str):
+        module = lir.Module(name)
+        module.triple = llvm.get_default_triple()
 
-        setattr(self.module, 'c_registry', self.c_registry)
+        self.c_registry = CRegistry(module, self.scope)
+        setattr(module, 'c_registry', self.c_registry)
+        return module
+    
+    def _get_callee(self, func: lir.Function):
+        if not self.split_functions:
+            return func
+        
+        ptr_name = f'{func.name}.ptr'
+        if ptr_name in self.module.globals:
+            ptr = self.module.get_global(ptr_name)
+        else:
+            ptr = lir.GlobalVariable(self.module, func.type, ptr_name)
+            ptr.linkage = 'external'
+        
+        return self.builder.load(ptr, f'{func.name}_fn')
     
     def _decrement_reference(self, pos: ir.Position, struct, type: ir.Type):
         Ref = cast(ir.Type, self.scope.type_map.get('Ref'))
         ref_index = index_of_type(type.type, Ref.type.as_pointer())
         if ref_index == -1:
-            warning(f'Type {type} needs memory management but has no Ref* field')
+            if TRACE.codegen:
+                trace('codegen', f'Type {type} needs memory management but has no Ref* field')
             return
 
         ref = self.builder.load(get_struct_ptr_field(self.builder, struct, ref_index)) if\
@@ -59,21 +90,38 @@ class CodeGeneration(CompilerPass):
         Ref = cast(ir.Type, self.scope.type_map.get('Ref'))
         ref_index = index_of_type(type.type, Ref.type.as_pointer())
         if ref_index == -1:
-            warning(f'Type {type} needs memory management but has no Ref* field')
+            if TRACE.codegen:
+                trace('codegen', f'Type {type} needs memory management but has no Ref* field')
         else:
             ref = get_struct_value_field(self.builder, struct, ref_index)
             self.scope.call(pos, self.builder, self.module, 'Ref.inc', [
                 ir.CallArgument(ref, Ref.as_pointer())
             ])
     
+    def _needs_memory_management(self, type: ir.Type):
+        """`type.needs_memory_management`, worked out once per LLVM type"""
+        cached = self.memory_managed_types.get(id(type.type))
+        if cached is None:
+            cached = (type.type, type.needs_memory_management(self.scope))
+            self.memory_managed_types[id(type.type)] = cached
+
+        return cached[1]
+    
+    def _manages_memory(self, node: ir.Node):
+        """Whether the value of `node` is reference counted when it is visited"""
+        node_class = type(node)
+        manages_memory = MANAGES_MEMORY.get(node_class)
+        if manages_memory is None:
+            manages_memory = not issubclass(node_class, DONT_MANAGE_MEMORY)
+            MANAGES_MEMORY[node_class] = manages_memory
+
+        return manages_memory and self._needs_memory_management(node.type)
+    
     def visit(self, node: ir.Node):
-        if isinstance(node, DONT_MANAGE_MEMORY):
-            return super().visit(node)
-
-        node_type = node.type
-        if not node_type.needs_memory_management(self.scope):
+        if not self._manages_memory(node):
             return super().visit(node)
         
+        node_type = node.type
         value = super().visit(node)
         if isinstance(value.type, lir.PointerType):
             value = self.builder.load(value)
@@ -95,14 +143,16 @@ class CodeGeneration(CompilerPass):
         return self.visit_Type(node.inner_type)
     
     def visit_Program(self, node: ir.Program):
-        info('Compiling program')
+        if TRACE.codegen:
+            trace('codegen', 'Compiling program')
         for n in node.nodes:
             self.visit(n)
         
         return str(self.module)
     
     def cleanup(self, pos: ir.Position):
-        info('Cleaning up')
+        if TRACE.codegen:
+            trace('codegen', 'Cleaning up')
 
         memory_management_symbols = [
             symbol for symbol in self.scope.symbol_table.local_symbols.values()
@@ -110,7 +160,8 @@ class CodeGeneration(CompilerPass):
         ]
 
         if len(memory_management_symbols) == 0:
-            info('No memory management symbols found')
+            if TRACE.codegen:
+                trace('codegen', 'No memory management symbols found')
             return
         
         cleanup_block = self.builder.function.append_basic_block('cleanup')
@@ -122,26 +173,31 @@ class CodeGeneration(CompilerPass):
             self._decrement_reference(pos, symbol.value, symbol_type)
         
         self.builder.position_at_end(old_builder.block)
-        info('Finished cleanup')
+        if TRACE.codegen:
+            trace('codegen', 'Finished cleanup')
     
     def visit_Body(self, node: ir.Body):
         self.scope = self.scope.clone()
-        info('Compiling body')
+        if TRACE.codegen:
+            trace('codegen', 'Compiling body')
 
         has_cleaned_up = False
         for stmt in node.nodes:
-            info(f'Compiling body statement {stmt.__class__.__name__}')
+            if TRACE.codegen:
+                trace('codegen', f'Compiling body statement {stmt.__class__.__name__}')
             if isinstance(stmt, ir.Return):
                 self.cleanup(stmt.pos)
                 has_cleaned_up = True
             
             self.visit(stmt)
-            info(f'Compiled body statement {stmt.__class__.__name__}')
+            if TRACE.codegen:
+                trace('codegen', f'Compiled body statement {stmt.__class__.__name__}')
         
         if not has_cleaned_up:
             self.cleanup(node.pos)
         
-        info('Compiled body')
+        if TRACE.codegen:
+            trace('codegen', 'Compiled body')
         self.scope = cast(ir.Scope, self.scope.parent)
     
     def visit_If(self, node: ir.If):
@@ -240,7 +296,12 @@ class CodeGeneration(CompilerPass):
         return self.visit(node.type)
     
     def visit_Function(self, node: ir.Function):
-        info(f'Compiling function {node.name}')
+        if TRACE.codegen:
+            trace('codegen', f'Compiling function {node.name}')
+        if self.split_functions and isinstance(node.body, ir.Body):
+            self.module = self._create_module(node.name)
+            self.function_modules[node.name] = self.module
+        
         ret_type = self.visit(node.type)
         param_types = [self.visit(param) for param in node.params]
         func = lir.Function(self.module, lir.FunctionType(ret_type, param_types), node.name)
@@ -254,7 +315,8 @@ class CodeGeneration(CompilerPass):
         ))
         
         if isinstance(node.body, ir.Body):
-            info('Compiling function body')
+            if TRACE.codegen:
+                trace('codegen', 'Compiling function body')
 
             old_builder = self.builder
             entry_block = func.append_basic_block('entry')
@@ -282,7 +344,8 @@ class CodeGeneration(CompilerPass):
             self.visit(node.body)
 
             if node.type == self.scope.type_map.get('nil'):
-                info(f'{node.name} has no return type, inserting ret NULL')
+                if TRACE.codegen:
+                    trace('codegen', f'{node.name} has no return type, inserting ret NULL')
                 self.builder.ret(NULL())
 
             for param in node.params:
@@ -290,7 +353,8 @@ class CodeGeneration(CompilerPass):
 
             self.builder = old_builder
 
-        info(f'Finished compiling function {node.name}')
+        if TRACE.codegen:
+            trace('codegen', f'Finished compiling function {node.name}')
         return func
     
     def visit_Variable(self, node: ir.Variable):
@@ -322,7 +386,8 @@ class CodeGeneration(CompilerPass):
     
     def visit_Return(self, node: ir.Return):
         value = self.visit(node.value)
-        info(f'Returning {value}')
+        if TRACE.codegen:
+            trace('codegen', f'Returning {value}')
         return self.builder.ret(value)
     
     def visit_Int(self, node: ir.Int):
@@ -350,10 +415,12 @@ class CodeGeneration(CompilerPass):
             return
         
         if hasattr(symbol.value, 'type') and isinstance(symbol.value.type, lir.PointerType):
-            info(f'Loading pointer {node.name}')
+            if TRACE.codegen:
+                trace('codegen', f'Loading pointer {node.name}')
             return self.builder.load(symbol.value, node.name)
         
-        info(f'Loading value {node.name}')
+        if TRACE.codegen:
+            trace('codegen', f'Loading value {node.name}')
         return symbol.value
     
     def visit_Call(self, node: ir.Call):
@@ -367,7 +434,7 @@ class CodeGeneration(CompilerPass):
             call_args = [ir.CallArgument(arg, n.type) for arg, n in zip(args, node.args)]
             return symbol.value(node.pos, self.scope, call_args, self.module, self.builder)
         elif isinstance(symbol.value, lir.Function):
-            return self.builder.call(symbol.value, args)
+            return self.builder.call(self._get_callee(symbol.value), args)
 
         node.pos.comptime_error(f'invalid callable {node.callee}', self.scope.src)
     
@@ -0,0 +1,117 @@
+from threading import Thread, Event, main_thread
+from collections import Counter
+from types import CodeType, FrameType
+from pathlib import Path
+import sys
+
+
+PACKAGE_PATH = Path(__file__).parent.absolute()
+STDLIB_PATH = PACKAGE_PATH / 'stdlib'
+PASSES_PATH = PACKAGE_PATH / 'passes'
+DEFAULT_INTERVAL = 0.001
+
+
+def get_module_name(filename: str):
+    if filename.startswith('<'):
+        # frozen modules, e.g. `<frozen importlib._bootstrap>`
+        return filename.strip('<>').split()[-1]
+
+    file = Path(filename)
+    if file.is_relative_to(PACKAGE_PATH):
+        parts = file.relative_to(PACKAGE_PATH.parent).with_suffix('').parts
+        return '.'.join(parts).removesuffix('.__init__')
+
+    if 'site-packages' in file.parts:
+        parts = file.parts[file.parts.index('site-packages') + 1:]
+        return '.'.join(Path(*parts).with_suffix('').parts)
+
+    return file.stem
+
+def get_stdlib_name(qualname: str):
+    """`int.init.<locals>.to_string` -> `int.to_string`, the name the builtin is registered as"""
+    parts = qualname.split('.<locals>.')
+    if len(parts) == 1:
+        return qualname
+
+    return f'{parts[0].split(".")[0]}.{parts[-1]}'
+
+
+class SamplingProfiler:
+    """Samples the main thread's Python stack every `interval` seconds from a background thread
+    and counts the collapsed stacks, which is the input format of flamegraph.pl and speedscope.
+
+    Frames are labelled so that the compiler's structure stands out: pass visitor methods by the
+    pass that runs them (`Analyser.visit_BinaryOp`), builtin definition functions by the name
+    they are registered as (`stdlib:int.to_string`) and anything else by module and function."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.labels: dict[CodeType, str] = {}
+        self.thread_id = main_thread().ident
+        self.stopped = Event()
+        self.thread = Thread(target=self._sample_loop, name='cure-profiler', daemon=True)
+        self.switch_interval = sys.getswitchinterval()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.stop()
+
+    def start(self):
+        # the sampler needs the GIL to look at the main thread, so hand it over more often
+        sys.setswitchinterval(min(self.switch_interval, self.interval / 2))
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        sys.setswitchinterval(self.switch_interval)
+
+    def _sample_loop(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._collapse(frame)] += 1
+
+    def _collapse(self, frame: FrameType | None):
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame))
+            frame = frame.f_back
+
+        return ';'.join(reversed(labels))
+
+    def _label(self, frame: FrameType):
+        code = frame.f_code
+        if code.co_name.startswith('visit_') and code.co_filename.startswith(str(PASSES_PATH)):
+            # label by the running pass, not by the class the method happens to be defined in
+            instance = frame.f_locals.get('self')
+            if instance is not None:
+                return f'{type(instance).__name__}.{code.co_name}'
+
+        if (label := self.labels.get(code)) is not None:
+            return label
+
+        qualname = getattr(code, 'co_qualname', code.co_name)
+        if code.co_filename.startswith(str(STDLIB_PATH)):
+            if qualname == '<module>':
+                qualname = f'{Path(code.co_filename).stem}.<module>'
+
+            label = f'stdlib:{get_stdlib_name(qualname)}'
+        else:
+            label = f'{get_module_name(code.co_filename)}:{qualname}'
+
+        self.labels[code] = label
+        return label
+
+    def write_folded(self, file: Path):
+        with file.open('w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+    @property
+    def samples(self):
+        return sum(self.stacks.values())
@@ -0,0 +1,67 @@
+from subprocess import run, DEVNULL, PIPE
+from dataclasses import dataclass
+from pathlib import Path
+from os import environ, pathsep
+import sys
+
+
+PACKAGE_ROOT = Path(__file__).parent.parent.absolute()
+CLI_CODE = 'import sys; from cure import CureArgParser; CureArgParser(sys.argv).parse()'
+
+
+@dataclass
+class ImportTime:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+def parse_import_times(output: str):
+    """Parse the `-X importtime` lines written to stderr, e.g.
+    `import time:       235 |        375 | llvmlite`"""
+    times = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        self_us, cumulative_us, name = line.removeprefix('import time:').split('|', 2)
+        if not self_us.strip().isdigit():
+            # the `self [us] | cumulative | imported package` header
+            continue
+
+        depth = (len(name) - len(name.lstrip())) // 2
+        times.append(ImportTime(name.strip(), int(self_us), int(cumulative_us), depth))
+
+    return times
+
+def profile_imports(args: list[str]):
+    """Run `cure <args>` in a fresh interpreter with `-X importtime` and return the time spent
+    importing every module, the command's own output is discarded"""
+    env = dict(environ)
+    python_path = [PACKAGE_ROOT.as_posix(), env.get('PYTHONPATH')]
+    env['PYTHONPATH'] = pathsep.join(path for path in python_path if path)
+
+    result = run(
+        [sys.executable, '-X', 'importtime', '-c', CLI_CODE, *args],
+        stdin=DEVNULL, stdout=DEVNULL, stderr=PIPE, text=True, env=env
+    )
+
+    return parse_import_times(result.stderr)
+
+def format_import_times(times: list[ImportTime], limit: int = 30):
+    total = sum(time.cumulative_us for time in times if time.depth == 0)
+    lines = [
+        f'total import time: {total / 1000:.1f}ms ({len(times)} modules)',
+        f'{"self":>10} {"cumulative":>12}  module'
+    ]
+
+    ordered = sorted(times, key=lambda time: time.cumulative_us, reverse=True)
+    for time in ordered[:limit]:
+        lines.append(
+            f'{time.self_us / 1000:>8.1f}ms {time.cumulative_us / 1000:>10.1f}ms  {time.module}'
+        )
+
+    if len(ordered) > limit:
+        lines.append(f'... {len(ordered) - limit} more')
+
+    return '\n'.join(lines)
@@ -0,0 +1,44 @@
+from statistics import median, stdev
+from dataclasses import dataclass, asdict
+from math import ceil
+from json import dumps
+
+
+def percentile(samples: list[float], p: float):
+    """Nearest-rank percentile of `samples`, `p` is between 0 and 100"""
+    ordered = sorted(samples)
+    rank = max(ceil(p / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+@dataclass
+class Summary:
+    """Summary of repeated timings, every time is in milliseconds"""
+
+    samples: int
+    warmup: int
+    min: float
+    median: float
+    mean: float
+    p95: float
+    max: float
+    stddev: float
+
+    @classmethod
+    def of(cls, samples: list[float], warmup: int = 0):
+        return cls(
+            len(samples), warmup, min(samples), median(samples), sum(samples) / len(samples),
+            percentile(samples, 95), max(samples), stdev(samples) if len(samples) > 1 else 0.0
+        )
+
+    def to_json(self):
+        return dumps(asdict(self))
+
+    def __str__(self):
+        return f"""samples: {self.samples} (after {self.warmup} warmup)
+min:     {self.min:.3f}ms
+median:  {self.median:.3f}ms
+mean:    {self.mean:.3f}ms
+p95:     {self.p95:.3f}ms
+max:     {self.max:.3f}ms
+stddev:  {self.stddev:.3f}ms"""
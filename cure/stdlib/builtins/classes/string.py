@@ -5,7 +5,7 @@ from llvmlite import ir as lir
 from cure.ir import Param, Position, Type, FunctionFlags, CallArgument
 from cure.lib import function, LibType, DefinitionContext
 from cure.codegen_utils import (
-    get_struct_value_field, create_struct_value, cast_value, NULL_BYTE, zero, NULL,
+    get_struct_value_field, create_struct_value, cast_value, NULL_BYTE, zero, one, NULL,
     get_struct_ptr_field, get_struct_ptr_field_value
 )
 
@@ -216,8 +216,8 @@ class string(LibType):
             b_len = get_struct_value_field(ctx.builder, b, 1, 'b_len')
 
             ctx.builder.comment('checking if lengths do not match')
-            with ctx.builder.if_then(ctx.builder.icmp_signed('!=', a_len, b_len, 'lengths_match')):
-                ctx.builder.ret(zero(0)) # false
+            with ctx.builder.if_then(ctx.builder.icmp_signed('!=', a_len, b_len, 'lengths_differ')):
+                ctx.builder.ret(zero(1)) # false
 
             ctx.builder.comment('checking is pointers are equal')
             a_ptr = get_struct_value_field(ctx.builder, a, 0, 'a_ptr')
@@ -225,7 +225,7 @@ class string(LibType):
             return ctx.builder.icmp_signed(
                 '==',
                 ctx.builder.call(memcmp, [a_ptr, b_ptr, a_len]),
-                zero(0)
+                zero(32)
             )
         
         @function(self, [
@@ -241,9 +241,9 @@ class string(LibType):
             a_len = get_struct_value_field(ctx.builder, a, 1, 'a_len')
             b_len = get_struct_value_field(ctx.builder, b, 1, 'b_len')
 
-            ctx.builder.comment('checking if lengths match')
-            with ctx.builder.if_then(ctx.builder.icmp_signed('==', a_len, b_len, 'lengths_match')):
-                ctx.builder.ret(zero(0)) # false
+            ctx.builder.comment('checking if lengths do not match')
+            with ctx.builder.if_then(ctx.builder.icmp_signed('!=', a_len, b_len, 'lengths_differ')):
+                ctx.builder.ret(one(1)) # true
 
             ctx.builder.comment('checking is pointers are equal')
             a_ptr = get_struct_value_field(ctx.builder, a, 0, 'a_ptr')
@@ -251,5 +251,5 @@ class string(LibType):
             return ctx.builder.icmp_signed(
                 '!=',
                 ctx.builder.call(memcmp, [a_ptr, b_ptr, a_len]),
-                zero(0)
+                zero(32)
             )
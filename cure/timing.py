@@ -0,0 +1,72 @@
+from dataclasses import dataclass, asdict
+from contextlib import contextmanager
+from time import perf_counter, process_time
+from json import dumps
+import tracemalloc
+
+
+@dataclass
+class PhaseTiming:
+    name: str
+    calls: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+    peak_memory: int = 0
+
+
+class PassTimer:
+    """Wall time, CPU time and peak Python memory of each compiler phase.
+
+    Disabled by default, `phase` then only checks a flag. Once enabled tracemalloc traces every
+    allocation, which slows Python code down, so compare wall times of runs with the same
+    setting only. A phase that runs more than once, e.g. `emit` for every function compiled by
+    the lazy JIT, is summed and keeps its highest peak."""
+
+    def __init__(self):
+        self.enabled = False
+        self.phases: dict[str, PhaseTiming] = {}
+
+    def enable(self):
+        self.enabled = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        tracemalloc.reset_peak()
+        start_memory, _ = tracemalloc.get_traced_memory()
+        start_wall, start_cpu = perf_counter(), process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = perf_counter() - start_wall, process_time() - start_cpu
+            _, peak_memory = tracemalloc.get_traced_memory()
+
+            timing = self.phases.setdefault(name, PhaseTiming(name))
+            timing.calls += 1
+            timing.wall += wall * 1000
+            timing.cpu += cpu * 1000
+            timing.peak_memory = max(timing.peak_memory, peak_memory - start_memory)
+
+    def to_json(self):
+        return dumps({'phases': [asdict(timing) for timing in self.phases.values()]})
+
+    def __str__(self):
+        lines = [f'{"phase":<12} {"wall":>11} {"cpu":>11} {"peak memory":>13} {"calls":>6}']
+        for timing in self.phases.values():
+            lines.append(
+                f'{timing.name:<12} {timing.wall:>9.3f}ms {timing.cpu:>9.3f}ms '\
+                    f'{timing.peak_memory / 1024:>10.1f}KiB {timing.calls:>6}'
+            )
+
+        wall = sum(timing.wall for timing in self.phases.values())
+        cpu = sum(timing.cpu for timing in self.phases.values())
+        lines.append(f'{"total":<12} {wall:>9.3f}ms {cpu:>9.3f}ms')
+        return '\n'.join(lines)
+
+
+TIMER = PassTimer()
@@ -0,0 +1,61 @@
+from typing import TextIO
+import sys
+
+
+CATEGORIES = ('parse', 'analyse', 'codegen', 'stdlib', 'jit', 'cache', 'driver')
+
+
+class TraceFlags:
+    """One boolean per trace category, all off by default.
+
+    Call sites check the flag before building their message, so a disabled category costs an
+    attribute load and a branch:
+
+        if TRACE.codegen:
+            trace('codegen', f'Compiling function {node.name}')"""
+
+    __slots__ = CATEGORIES
+
+    def __init__(self):
+        for category in CATEGORIES:
+            setattr(self, category, False)
+
+    parse: bool
+    analyse: bool
+    codegen: bool
+    stdlib: bool
+    jit: bool
+    cache: bool
+    driver: bool
+
+
+TRACE = TraceFlags()
+_sink: TextIO = sys.stderr
+
+
+def parse_categories(categories: str):
+    """Parse a comma-separated `--trace` value, `all` selects every category"""
+    names = [name.strip() for name in categories.split(',') if name.strip()]
+    if 'all' in names:
+        return list(CATEGORIES)
+
+    unknown = [name for name in names if name not in CATEGORIES]
+    if unknown:
+        raise ValueError(f'unknown trace categories {", ".join(unknown)}')
+
+    return names
+
+def enable(categories: list[str], sink: TextIO | None = None):
+    global _sink
+    for category in categories:
+        setattr(TRACE, category, True)
+
+    if sink is not None:
+        _sink = sink
+
+def disable():
+    for category in CATEGORIES:
+        setattr(TRACE, category, False)
+
+def trace(category: str, message: str):
+    _sink.write(f'[{category}] {message}\n')
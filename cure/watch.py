@@ -0,0 +1,118 @@
+from time import perf_counter, sleep
+from pathlib import Path
+from os import stat
+import sys
+
+from cure.backend import create_target_machine, init_llvm, flush_c_streams
+from cure.passes.code_generation import CodeGeneration
+from cure.incremental import IncrementalFrontEnd
+from cure.cache import CompileCache
+from cure.trace import TRACE, trace
+from cure.jit import LazyJIT
+from cure import (
+    CompileOptions, BenchmarkOptions, DEFAULT_WATCH_INTERVAL, get_target_key, run_main
+)
+
+
+class MemoryCache(CompileCache):
+    """Compile cache that lives in memory and keeps only the entries the latest build used, so
+    it holds one object per function of the current version of the file"""
+
+    def __init__(self):
+        super().__init__()
+        self.entries: dict[str, bytes] = {}
+        self.used: dict[str, bytes] = {}
+
+    def get(self, key: str):
+        data = self.entries.get(key)
+        if data is not None:
+            self.used[key] = data
+
+        return data
+
+    def put(self, key: str, data: bytes):
+        self.entries[key] = data
+        self.used[key] = data
+
+    def prune(self):
+        self.entries, self.used = self.used, {}
+
+
+class Watcher:
+    """Runs a file every time it changes on disk, keeping the compiler warm in between.
+
+    The prelude scope, LLVM and the target machine are set up once. The front end only reparses
+    and reanalyses the functions that changed, and every function's object code is kept by its
+    IR, so a function that did not change is not optimised or compiled again."""
+
+    def __init__(
+        self, file: Path, options: CompileOptions, benchmark: BenchmarkOptions | None = None,
+        interval: float = DEFAULT_WATCH_INTERVAL
+    ):
+        self.file = file
+        self.options = options
+        self.benchmark = benchmark
+        self.interval = interval
+
+        init_llvm()
+        self.front_end = IncrementalFrontEnd(file, options.parser)
+        self.objects = MemoryCache()
+        self.target_machine = create_target_machine(
+            options.opt_level, cpu=options.cpu, features=options.features
+        )
+        self.target_key = get_target_key(options)
+
+    def get_state(self):
+        try:
+            file_stat = stat(self.file)
+        except OSError:
+            return None
+
+        return file_stat.st_mtime_ns, file_stat.st_size
+
+    def watch(self):
+        print(f'cure watch: watching {self.file.as_posix()}, press Ctrl+C to stop', file=sys.stderr)
+        state = None
+        try:
+            while True:
+                new_state = self.get_state()
+                if new_state is not None and new_state != state:
+                    state = new_state
+                    self.rebuild()
+
+                sleep(self.interval)
+        except KeyboardInterrupt:
+            pass
+
+    def rebuild(self):
+        start = perf_counter()
+        try:
+            res = self.run()
+        except SystemExit:
+            # a compile error was already printed, wait for the next change
+            flush_c_streams()
+            print('cure watch: build failed, waiting for changes', file=sys.stderr, flush=True)
+            return
+
+        front_end = self.front_end
+        print(
+            f'cure watch: main returned {res} after {(perf_counter() - start) * 1000:.1f}ms, '\
+                f'reparsed {front_end.reparsed} segments, reanalysed {front_end.reanalysed} '\
+                    f'functions and reused {front_end.reused}',
+            file=sys.stderr, flush=True
+        )
+
+    def run(self):
+        scope, program = self.front_end.update()
+        modules = CodeGeneration.run_split(scope, program)
+        if TRACE.driver:
+            trace('driver', f'Running {self.file.as_posix()}')
+
+        with LazyJIT(
+            self.target_machine, self.options.opt_level, modules, self.objects, self.target_key
+        ) as engine:
+            res = run_main(engine.get_address('main'), self.benchmark)
+
+        flush_c_streams()
+        self.objects.prune()
+        return res
@@ -1,8 +1,5 @@
-from logging import basicConfig, DEBUG
 from sys import argv
 
-from colorama import init
-
 from cure import CureArgParser
 
 
@@ -11,16 +8,5 @@ def main():
     arg_parser.parse()
 
 
-def setup_logger():
-    basicConfig(
-        filename='debug.log', filemode='w',
-        format='%(filename)s (line %(lineno)d) [%(levelname)s] - %(message)s',
-        encoding='utf-8', level=DEBUG
-    )
-
-
-
 if __name__ == '__main__':
-    init()
-    setup_logger()
     main()